@@ -2,13 +2,39 @@
 It includes a list of Musician objects (band members) and the date when the band started performing together.
 """
 
+from bisect import bisect_left, bisect_right
 from datetime import date, datetime, time
 import json
+import re
 
-from music.musician import Musician, musician_py_to_json, musician_json_to_py
+from music.musician import BAND_MEMBER_SUFFIXES, SINGER_SONGWRITER_PREFIX, Musician, musician_py_to_json, \
+    musician_json_to_py, parse_musician_str
 # from util.utility import format_date
 
 
+class MemberIndex:
+    """The class describing the indexes of the members of a band, for O(1) membership checks and lookups:
+    the set of the members, and dicts of the members by name, by Instrument and by Vocals.
+    If several members have the same name, by_name maps it to the first one.
+    """
+
+    def __init__(self, members):
+        self.members = set(members)
+        self.by_name = {}
+        by_instrument = {}
+        by_vocals = {}
+        for member in members:
+            self.by_name.setdefault(member.name, member)
+            instrument = getattr(member, 'instrument', None)
+            if instrument is not None:
+                by_instrument.setdefault(instrument, []).append(member)
+            vocals = getattr(member, 'vocals', None)
+            if vocals is not None:
+                by_vocals.setdefault(vocals, []).append(member)
+        self.by_instrument = {instrument: tuple(members) for instrument, members in by_instrument.items()}
+        self.by_vocals = {vocals: tuple(members) for vocals, members in by_vocals.items()}
+
+
 class Band():
     """The class describing the concept of a music group/band.
     It includes a list of Musician objects (band members) and the date when the band started performing together.
@@ -34,7 +60,6 @@ class Band():
         self.members = members
         self.formed = formed
         self.split = split
-        pass                                            # introduce and initialize iterator counter, self.__i
 
     def __str__(self):
         tab = '\t'
@@ -48,29 +73,80 @@ class Band():
     def __eq__(self, other):
         return isinstance(other, Band) and self.name == other.name and self.members == other.members
 
+    # The members are a property, so that setting them invalidates the member index (built lazily when needed)
+    @property
+    def members(self):
+        return self.__members
+
+    @members.setter
+    def members(self, members):
+        self.__members = tuple(members)
+        self.__member_index = None
+
+    def get_member_index(self):
+        if self.__member_index is None:
+            self.__member_index = MemberIndex(self.__members)
+        return self.__member_index
+
+    def __contains__(self, musician):
+        """Membership check (musician in band), consistent with the hashes of Musician objects.
+        """
+
+        return musician in self.get_member_index().members
+
+    def get_member(self, name, default=None):
+        return self.get_member_index().by_name.get(name, default)
+
+    def get_members_by_instrument(self, instrument):
+        return self.get_member_index().by_instrument.get(instrument, ())
+
+    def get_members_by_vocals(self, vocals):
+        return self.get_member_index().by_vocals.get(vocals, ())
+
+    def __getstate__(self):
+        """Leaves the member index out of pickles (it is rebuilt when needed).
+        """
+
+        state = self.__dict__.copy()
+        state['_Band__member_index'] = None
+        return state
+
     @staticmethod
     def parse_band_str(band_str):
-        """Splits a band string in its typical segments.
+        """Splits a band string in its typical segments (see parse_band_blocks()).
+        The formed and split segments are years (ints) or dates, as in band_str.
         """
-        name, *members_str, rest1 = band_str.split('\n\t')
-        last_member, formed_str, split_str = rest1.split('\n')
-        members_str.append(last_member)
-        members = [Musician.from_str(member) for member in members_str]
-        formed = int(formed_str[-5:-1])
-        split = int(split_str[-5:-1])
 
+        if has_only_newlines(band_str):
+            band = split_band_str(band_str)             # the common case: one band, no errors
+            if band is not None:
+                return band
+        blocks = parse_band_blocks(band_str, positions=True)
+        name, members, formed, split, _ = next(blocks, (None, None, None, None, None))
+        if name is None:
+            raise BandFormatError('no band', len(band_str.splitlines()) + 1, 1)
+        for next_name, *_, (name_position, _, _) in blocks:
+            raise BandFormatError(f'more than one band (next: {next_name!r})', *name_position)
         return name, members, formed, split
 
     # # Alternative constructor 1
     @classmethod
     def from_band_str_year(cls, band_str):
         name, members, formed, split = Band.parse_band_str(band_str)
-        return cls(name, *members, formed=formed, split=split)
+        return cls(name, *members, formed=get_year(formed), split=get_year(split))
 
     # Alternative constructor 2
     @classmethod
     def from_band_str_date(cls, band_str):
-        pass
+        """Like from_band_str_year(), but for band strings with full dates (e.g. 'The band was formed on 1962-08-18.').
+        """
+
+        name, members, formed, split = Band.parse_band_str(band_str)
+        for i, d in enumerate((formed, split), 1):
+            if not isinstance(d, date):
+                positions = next(parse_band_blocks(band_str, positions=True))[4]
+                raise BandFormatError(f'expected a date, got the year {d}', *positions[i])
+        return cls(name, *members, formed=formed, split=split)
 
     @staticmethod
     def is_date_valid(d):
@@ -81,24 +157,198 @@ class Band():
         return date(1960, 1, 1) < d < date.today()
 
     def __iter__(self):
-        """Once __iter__() and __next__() are implemented in a class,
+        """Once __iter__() is implemented in a class,
         we can create an iterator object by calling the iter() built-in function on an object of the class,
         and then call the next() built-in function on that object.
-        It is often sufficient to just return self in __iter__(),
-        if the iterator counter such as self.__i is introduced and initialized in __init__().
-        Alternatively, the iterator counter (self.__i) is introduced and initialized  here.
+        Returning self from __iter__() (and implementing __next__() with an iterator counter such as self.__i)
+        makes the band its own iterator, so two loops over the same band (nested, or in different threads)
+        share the counter and corrupt each other's position. Instead, each call returns a new iterator over
+        the members tuple, which keeps its own position and is implemented in C.
         """
 
-        self.__i = 0
-        return self               # sufficient if the iterator counter is introduced and initialized in __init__()
+        return iter(self.members)
+
+
+class BandFormatError(ValueError):
+    """Exception raised when a band string does not have the format generated by Band.__str__().
+    The line and column (counted from 1) show where the error is.
+    """
+
+    def __init__(self, message, line, column):
+        self.line = line
+        self.column = column
+        self.message = f'line {line}, column {column}: {message}'
+        super().__init__(self.message)
+
 
-    def __next__(self):
-        if self.__i < len(self.members):
-            member = self.members[self.__i]
-            self.__i += 1
-            return member
+# The formed and split sentences of band strings, with years (1962) or dates (1962-08-18), e.g.
+# 'The band was formed in 1962.', 'The band has been formed on 1962-08-18.', 'The band split up in 1970.'
+formed_regex = re.compile(r'The band (?:was|has been) formed (?:in|on) (\d{4}(?:-\d\d-\d\d)?)\.')
+split_regex = re.compile(r'The band split up (?:in|on) (\d{4}(?:-\d\d-\d\d)?)\.')
+
+# The formed and split sentences at the end of a band string (see split_band_str())
+sentences_regex = re.compile(formed_regex.pattern + r'\n' + split_regex.pattern)
+
+# The end of the lines of plain band members (musicians with no enum suffixes), and the beginning of the lines of
+# singer-songwriters; split_band_str() counts them to recognize the bands whose members are all plain band members
+BAND_MEMBER_LINE_END = BAND_MEMBER_SUFFIXES[True] + '\n'
+SINGER_SONGWRITER_LINE_START = '\n\t' + SINGER_SONGWRITER_PREFIX
+
+
+def has_only_newlines(text):
+    """Returns True if text has no line boundaries other than newlines (such as carriage returns or the Unicode
+    line separator), i.e. if splitting text at newlines gives the same lines as text.splitlines().
+    """
+
+    # a chain of 'in' tests, since any() with a generator costs more than the tests themselves on a band string
+    return not ('\r' in text or '\v' in text or '\f' in text or '\x1c' in text or '\x1d' in text or
+                '\x1e' in text or '\x85' in text or '\u2028' in text or '\u2029' in text)
+
+
+def split_band_str(band_str):
+    """Returns the (name, members, formed, split) tuple of band_str, a single band string in the format generated by
+    Band.__str__(), split at the newlines and tabs before the members (the way it is joined), with the formed and
+    split sentences matched at the end by sentences_regex, or None if band_str has any other layout or an error
+    (parse_band_lines() then finds the position of the error).
+    band_str must not contain line boundaries other than newlines (see has_only_newlines()).
+    """
+
+    name, *members = band_str.split('\n\t')
+    if not members or not name or name[0] == '\t':
+        return None
+    last = members[-1]                                  # the last member (if any) and the sentences
+    i = last.find('\n')
+    match = sentences_regex.fullmatch(last, i + 1)
+    if match is not None:
+        members[-1] = last[:i]
+    else:
+        match = sentences_regex.fullmatch(last)         # no members, the formed sentence after a tab
+        if match is None:
+            return None
+        members.pop()
+    if band_str.count('\n') != len(members) + 2:         # a newline in the name or in a member
+        return None
+    formed, split = match.groups()
+    try:
+        if (band_str.count(BAND_MEMBER_LINE_END, len(name)) == len(members) and
+                SINGER_SONGWRITER_LINE_START not in band_str):
+            # all the members are plain band members (the most common case), so their names are cut off
+            # the band member suffix directly, the way parse_musician_str() would split them
+            end = -len(BAND_MEMBER_SUFFIXES[True])
+            members = [Musician(member[:end], True) for member in members]
         else:
-            raise StopIteration
+            members = [parse_musician_str(member) for member in members]
+        return (name, members,
+                int(formed) if len(formed) == 4 else date.fromisoformat(formed),
+                int(split) if len(split) == 4 else date.fromisoformat(split))
+    except ValueError:
+        return None
+
+
+def parse_year_or_date(match, line_number):
+    """Returns the year (int) or date matched by formed_regex or split_regex in line line_number.
+    """
+
+    s = match[1]
+    try:
+        return int(s) if len(s) == 4 else date.fromisoformat(s)
+    except ValueError as e:
+        raise BandFormatError(str(e), line_number, match.start(1) + 1) from None
+
+
+def parse_band_blocks(text, positions=False):
+    """Generator that parses text (a string, or an iterable of lines such as an open file) that contains
+    band strings in the format generated by Band.__str__(), one after another (blank lines between them are skipped),
+    and yields the (name, members, formed, split) tuple of each band; formed and split are years (ints) or dates.
+    If positions is True, the tuples have a fifth item, the (line, column) positions of the name, of the formed value
+    and of the split value, e.g. ((1, 1), (6, 24), (7, 22)), for reporting errors found after parsing.
+    In a string, each band is first split with split_band_str(), which is faster than going line by line;
+    from the first band that it cannot split (e.g. because of an error), the rest of the text is parsed by
+    parse_band_lines(), which also parses iterables of lines and finds the positions.
+    Raises BandFormatError with the position of the first error.
+    """
+
+    first_line = 1
+    if isinstance(text, str) and not positions and has_only_newlines(text):
+        pos, length = 0, len(text)
+        while pos < length:
+            if text[pos] == '\n':                       # a blank line
+                pos += 1
+                continue
+            end = text.find('\nThe band split up ', pos)     # the band ends with the first split sentence
+            if end == -1:
+                break
+            end = text.find('\n', end + 1)
+            if end == -1:
+                end = length
+            band = split_band_str(text[pos:end])
+            if band is None:
+                break
+            yield band
+            pos = end + 1
+        if pos >= length:
+            return
+        first_line = text.count('\n', 0, pos) + 1
+        text = text[pos:]
+    yield from parse_band_lines(text, positions, first_line)
+
+
+def parse_band_lines(text, positions=False, first_line=1):
+    """Generator that does what parse_band_blocks() does, line by line; first_line is the number of the first line.
+    Each line is a token, recognized by its first character and, if needed, matched with formed_regex and split_regex:
+        <name>
+        \t<member>                                      (zero or more; parse_musician_str() parses each one)
+        The band was formed in <year or date>.          (after a tab if there are no members)
+        The band split up in <year or date>.
+    """
+
+    lines = text.splitlines() if isinstance(text, str) else (line.rstrip('\r\n') for line in text)
+    state = 'name'                                      # what the next line should be: name, member, split
+    line_number = first_line - 1
+    for line_number, line in enumerate(lines, first_line):
+        if state == 'member':
+            if line.startswith('\t'):
+                match = formed_regex.fullmatch(line, 1) if line.startswith('The band ', 1) else None
+                if match is None:
+                    try:
+                        members.append(parse_musician_str(line[1:]))
+                    except ValueError as e:
+                        raise BandFormatError(str(e), line_number, 2) from None
+                    continue
+            else:
+                match = formed_regex.fullmatch(line)
+                if match is None:
+                    raise BandFormatError('expected a member (after a tab) or the sentence about when the band '
+                                          'was formed', line_number, 1)
+            formed, formed_position = parse_year_or_date(match, line_number), (line_number, match.start(1) + 1)
+            state = 'split'
+        elif state == 'name':
+            if not line:
+                continue
+            if line[0] == '\t':
+                raise BandFormatError('expected a band name', line_number, 1)
+            name, members, name_line, state = line, [], line_number, 'member'
+        else:
+            match = split_regex.fullmatch(line)
+            if match is None:
+                raise BandFormatError('expected the sentence about when the band split up', line_number, 1)
+            split = parse_year_or_date(match, line_number)
+            if positions:
+                yield name, members, formed, split, ((name_line, 1), formed_position, (line_number, match.start(1) + 1))
+            else:
+                yield name, members, formed, split
+            state = 'name'
+    if state != 'name':
+        raise BandFormatError('unexpected end of text, expected the sentence about when the band ' +
+                              ('was formed' if state == 'member' else 'split up'), line_number + 1, 1)
+
+
+def parse_bands(text):
+    """Generator that yields the Band objects from text (see parse_band_blocks()).
+    """
+
+    for name, members, formed, split in parse_band_blocks(text):
+        yield Band(name, *members, formed=formed, split=split)
 
 
 def next_member(band):
@@ -125,27 +375,243 @@ class BandEncoder(json.JSONEncoder):
 
 def band_py_to_json(band):
     """JSON encoder for Band objects (default= parameter in json.dumps()).
+    The members are nested as a native JSON list, which json.dumps() then encodes by calling this function again
+    for each member, so other objects are passed on to musician_py_to_json().
     """
 
     if isinstance(band, Band):
-        d = band.__dict__.copy()
-        d["members"] = json.dumps(band.members, default=musician_py_to_json)
+        d = {"name": band.name, "members": list(band.members), "formed": band.formed, "split": band.split}
         return {"__Band__": d}
     else:
-        raise TypeError(f'object of type {band.__class__.__name__}')
+        return musician_py_to_json(band)
 
 
 def band_json_to_py(band_json):
     """JSON decoder for Band objects (object_hook= parameter in json.loads()).
+    json.loads() calls it for the nested objects first, so the members are already decoded (other objects are
+    passed on to musician_json_to_py()). Also accepts the legacy format, with the members as a nested JSON string.
     """
 
     if "__Band__" in band_json:
-        b = Band('')
-        b.__dict__.update(band_json["__Band__"])
-        b.members = tuple(json.loads(b.members, object_hook=musician_json_to_py))
-        return b
+        d = band_json["__Band__"]
+        members = d["members"]
+        if isinstance(members, str):
+            members = json.loads(members, object_hook=musician_json_to_py)
+        return Band(d["name"], *members, formed=d["formed"], split=d["split"])
     else:
-        return band_json
+        return musician_json_to_py(band_json)
+
+
+def get_year(d):
+    """Returns the year of d, which is either a year (int) or a date (like the formed and split fields of Band objects).
+    """
+
+    return d.year if isinstance(d, date) else d
+
+
+class BandCatalog:
+    """The class describing an in-memory catalog of bands, indexed by their formed-split spans (in years),
+    for fast range queries such as the bands active in a year, formed in a range of years, or active in any year
+    of a range of years (overlap queries).
+
+    The indexes are sorted lists, searched by bisection:
+    - formed_years and bands are parallel lists of all the bands, sorted by the year they were formed,
+      so formed_between() is a slice between two bisections
+    - split_years is the sorted list of the years the bands split, so the counts of the bands active in a range
+      of years are differences of two bisections (see count_overlapping())
+    - buckets group the bands by the length of their formed-split spans, in powers of two (the key of a bucket is
+      span.bit_length(), so the spans in bucket k are less than 2**k years); each bucket holds parallel lists
+      of the formed years, split years and bands, sorted by the formed years. In each bucket, a band active in
+      first_year - last_year must have been formed in first_year - 2**k + 1 - last_year, so overlapping()
+      only checks the bands formed in that range, and at least about half of them are actually active.
+
+    The catalog also maintains a reverse index, bands_by_musician, from each musician (hashed and compared as usual
+    for Musician objects) to the list of the bands they played in, for the queries on the collaboration graph
+    (get_bands(), get_collaborators(), get_connection()). The index is updated as bands are added and removed,
+    so remove a band from the catalog before changing its members, and add it again afterwards.
+    """
+
+    def __init__(self, bands=()):
+        bands = sorted(bands, key=lambda band: get_year(band.formed))
+        self.bands = bands
+        self.formed_years = [get_year(band.formed) for band in bands]
+        self.split_years = sorted(get_year(band.split) for band in bands)
+        self.buckets = {}
+        for formed, band in zip(self.formed_years, bands):
+            split = get_year(band.split)
+            formed_years, split_years, bucket_bands = self.buckets.setdefault((split - formed).bit_length(),
+                                                                             ([], [], []))
+            formed_years.append(formed)
+            split_years.append(split)
+            bucket_bands.append(band)
+        self.bands_by_musician = {}
+        for band in bands:
+            self.index_members(band)
+
+    def index_members(self, band):
+        for member in dict.fromkeys(band.members):          # each member once, even if listed twice
+            self.bands_by_musician.setdefault(member, []).append(band)
+
+    @classmethod
+    def from_json(cls, bands_json):
+        """Alternative constructor, from a JSON list of bands (e.g. made by json.dumps(bands, default=band_py_to_json)).
+        """
+
+        return cls(json.loads(bands_json, object_hook=band_json_to_py))
+
+    def add(self, band):
+        formed, split = get_year(band.formed), get_year(band.split)
+        i = bisect_right(self.formed_years, formed)
+        self.formed_years.insert(i, formed)
+        self.bands.insert(i, band)
+        self.split_years.insert(bisect_right(self.split_years, split), split)
+        formed_years, split_years, bucket_bands = self.buckets.setdefault((split - formed).bit_length(), ([], [], []))
+        i = bisect_right(formed_years, formed)
+        formed_years.insert(i, formed)
+        split_years.insert(i, split)
+        bucket_bands.insert(i, band)
+        self.index_members(band)
+
+    def extend(self, bands):
+        for band in bands:
+            self.add(band)
+
+    @staticmethod
+    def remove_band(formed_years, bands, band, formed):
+        """Removes band from the parallel lists formed_years and bands, and returns its index (or None if not there).
+        """
+
+        for i in range(bisect_left(formed_years, formed), bisect_right(formed_years, formed)):
+            if bands[i] is band:
+                del formed_years[i]
+                del bands[i]
+                return i
+        return None
+
+    def remove(self, band):
+        """Removes band (the object itself, not an equal one) from the catalog; raises ValueError if it is not there.
+        """
+
+        formed, split = get_year(band.formed), get_year(band.split)
+        if BandCatalog.remove_band(self.formed_years, self.bands, band, formed) is None:
+            raise ValueError(f'band {band.name!r} not in catalog')
+        del self.split_years[bisect_left(self.split_years, split)]
+        formed_years, split_years, bucket_bands = self.buckets[(split - formed).bit_length()]
+        del split_years[BandCatalog.remove_band(formed_years, bucket_bands, band, formed)]
+        for member in dict.fromkeys(band.members):
+            bands = self.bands_by_musician[member]
+            del bands[next(i for i, b in enumerate(bands) if b is band)]
+            if not bands:
+                del self.bands_by_musician[member]
+
+    def __len__(self):
+        return len(self.bands)
+
+    def __iter__(self):
+        """Iterates over the bands in the order of the year they were formed.
+        """
+
+        return iter(self.bands)
+
+    def formed_between(self, first_year, last_year):
+        """Returns the list of the bands formed in first_year - last_year (inclusive).
+        """
+
+        return self.bands[bisect_left(self.formed_years, first_year):bisect_right(self.formed_years, last_year)]
+
+    def overlapping(self, first_year, last_year):
+        """Returns the list of the bands active in any year of first_year - last_year (inclusive),
+        i.e. formed until last_year and split in first_year or later, ordered by the buckets.
+        """
+
+        overlapping = []
+        for k, (formed_years, split_years, bands) in self.buckets.items():
+            start = bisect_left(formed_years, first_year - (1 << k) + 1)
+            end = bisect_right(formed_years, last_year)
+            overlapping.extend(band for band, split in zip(bands[start:end], split_years[start:end])
+                               if split >= first_year)
+        return overlapping
+
+    def active_in(self, year):
+        """Returns the list of the bands active in year (formed until year and split in year or later).
+        """
+
+        return self.overlapping(year, year)
+
+    def count_overlapping(self, first_year, last_year):
+        """Returns the number of the bands active in any year of first_year - last_year (inclusive), in O(log n).
+        A band that split before first_year was also formed before it, so these bands are all counted
+        among the bands formed until last_year.
+        """
+
+        return max(bisect_right(self.formed_years, last_year) - bisect_left(self.split_years, first_year), 0)
+
+    def count_active_in(self, year):
+        return self.count_overlapping(year, year)
+
+    def count_formed_between(self, first_year, last_year):
+        return max(bisect_right(self.formed_years, last_year) - bisect_left(self.formed_years, first_year), 0)
+
+    def get_bands(self, musician):
+        """Returns the list of the bands in the catalog that musician played in.
+        """
+
+        return list(self.bands_by_musician.get(musician, ()))
+
+    def get_collaborators(self, musician):
+        """Returns the set of the musicians who played in at least one band with musician.
+        """
+
+        collaborators = {member for band in self.bands_by_musician.get(musician, ()) for member in band.members}
+        collaborators.discard(musician)
+        return collaborators
+
+    def get_connection(self, musician, other):
+        """Returns the shortest connection between musician and other in the collaboration graph, as the list
+        [musician, band, musician, band,..., other] (each band has the musicians before and after it as members),
+        or None if they are not connected.
+        Bidirectional breadth-first search: the smaller of the two frontiers (one from musician, one from other)
+        is expanded one level at a time, until a musician reached from one side has already been reached from the
+        other side. Each band is expanded at most once from each side.
+        """
+
+        if musician not in self.bands_by_musician or other not in self.bands_by_musician:
+            return None
+        if musician == other:
+            return [musician]
+        # musician -> (the musician it was reached from, their band), on each side
+        sides = [({musician: None}, set(), [musician]), ({other: None}, set(), [other])]
+        while sides[0][2] and sides[1][2]:
+            side = 0 if len(sides[0][2]) <= len(sides[1][2]) else 1
+            previous, visited_bands, frontier = sides[side]
+            opposite = sides[1 - side][0]
+            next_frontier = []
+            for current in frontier:
+                for band in self.bands_by_musician[current]:
+                    if id(band) in visited_bands:
+                        continue
+                    visited_bands.add(id(band))
+                    for member in band.members:
+                        if member not in previous:
+                            previous[member] = (current, band)
+                            if member in opposite:
+                                return (BandCatalog.get_path(sides[0][0], member)[::-1] +
+                                        BandCatalog.get_path(sides[1][0], member)[1:])
+                            next_frontier.append(member)
+            sides[side] = (previous, visited_bands, next_frontier)
+        return None
+
+    @staticmethod
+    def get_path(previous, musician):
+        """Returns the path [musician, band, musician,...] from musician back to the start of a search
+        (previous maps each reached musician to the musician it was reached from and their band).
+        """
+
+        path = [musician]
+        while previous[musician] is not None:
+            musician, band = previous[musician]
+            path += [band, musician]
+        return path
 
 
 if __name__ == "__main__":
@@ -207,6 +673,141 @@ if __name__ == "__main__":
     #         break
     # print()
 
+    # # Iterate over a large band, and generate all pairs of members with nested loops
+    # # (a band that is its own iterator, with a counter in __next__(), vs. iter(self.members))
+    # import timeit
+    # class SelfIteratingBand(Band):
+    #     def __iter__(self):
+    #         self.i = 0
+    #         return self
+    #     def __next__(self):
+    #         if self.i < len(self.members):
+    #             member = self.members[self.i]
+    #             self.i += 1
+    #             return member
+    #         else:
+    #             raise StopIteration
+    # musicians = [Musician(f'Musician {i}') for i in range(1_000_000)]
+    # for cls in (SelfIteratingBand, Band):
+    #     band = cls('Orchestra', *musicians)
+    #     print(f'{cls.__name__}: {timeit.timeit(lambda: sum(1 for _ in band), number=1) * 1000:.0f} ms for 1M members')
+    #     band = cls('Orchestra', *musicians[:2000])
+    #     start = timeit.default_timer()
+    #     pairs = [(a, b) for a in band for b in band]
+    #     print(f'{cls.__name__}: {len(pairs):,} pairs (expected 4,000,000) in '
+    #           f'{(timeit.default_timer() - start) * 1000:.0f} ms')
+    # print()
+
+    # # Membership checks, lookups by name and role queries in a band with 5000 members (linear scans vs. index)
+    # import random
+    # import timeit
+    # from music.musician import Singer, Songwriter
+    # from music.enums import Instrument, Vocals
+    # orchestra = Band('Orchestra', *[Songwriter(name=f'Musician {i}', instrument=random.choice(list(Instrument)))
+    #                                 if i % 2 else Singer(name=f'Musician {i}', vocals=random.choice(list(Vocals)))
+    #                                 for i in range(5000)])
+    # queries = random.sample(orchestra.members, 1000)
+    # def scan():
+    #     return ([m in orchestra.members for m in queries],
+    #             [next(m for m in orchestra.members if m.name == q.name) for q in queries],
+    #             [m for m in orchestra.members if getattr(m, 'instrument', None) == Instrument.BASS])
+    # def indexed():
+    #     return ([m in orchestra for m in queries],
+    #             [orchestra.get_member(q.name) for q in queries],
+    #             list(orchestra.get_members_by_instrument(Instrument.BASS)))
+    # print(scan() == indexed())
+    # print(f'linear scans: {timeit.timeit(scan, number=1) * 1000:.1f} ms')
+    # print(f'index:        {timeit.timeit(indexed, number=1) * 1000:.3f} ms (incl. building the index)')
+    # print(f'index:        {timeit.timeit(indexed, number=1) * 1000:.3f} ms')
+    # print()
+
+    # # Range queries on a catalog of 100k bands (scanning all the bands vs. BandCatalog)
+    # import random
+    # import timeit
+    # bands = []
+    # for i in range(100_000):
+    #     formed = random.randint(1960, 2020)
+    #     bands.append(Band(f'Band {i}', formed=formed, split=min(formed + int(random.expovariate(1 / 8)), 2026)))
+    # start = timeit.default_timer()
+    # catalog = BandCatalog.from_json(json.dumps(bands, default=band_py_to_json))
+    # print(f'bulk load from JSON: {(timeit.default_timer() - start) * 1000:.0f} ms')
+    # queries = {
+    #     'active in 1967': (lambda: [b for b in bands if b.formed <= 1967 <= b.split],
+    #                        lambda: catalog.active_in(1967)),
+    #     'formed in 1960-1965': (lambda: [b for b in bands if 1960 <= b.formed <= 1965],
+    #                             lambda: catalog.formed_between(1960, 1965)),
+    #     'active in 1970-1975': (lambda: [b for b in bands if b.formed <= 1975 and b.split >= 1970],
+    #                             lambda: catalog.overlapping(1970, 1975)),
+    #     'count active in 1967': (lambda: sum(1 for b in bands if b.formed <= 1967 <= b.split),
+    #                              lambda: catalog.count_active_in(1967)),
+    # }
+    # for query, (scan, indexed) in queries.items():
+    #     same = (sorted(b.name for b in scan()) == sorted(b.name for b in indexed())) if isinstance(scan(), list) \
+    #         else scan() == indexed()
+    #     print(f'{query}: scan {timeit.timeit(scan, number=10) * 100:.2f} ms, '
+    #           f'catalog {timeit.timeit(indexed, number=10) * 100:.3f} ms, {same}')
+    # print()
+
+    # # Collaboration graph queries (the reverse index from musicians to bands)
+    # the_beatles = Band('The Beatles', johnLennon, paulMcCartney, georgeHarrison, ringoStarr, formed=1962, split=1970)
+    # the_rolling_stones = Band('The Rolling Stones', mickJagger, keithRichards, charlieWatts, ronWood,
+    #                           formed=1962, split=2026)
+    # faces = Band('Faces', ronWood, Musician('Rod Stewart'), Musician('Ronnie Lane'), formed=1969, split=1975)
+    # the_dirty_mac = Band('The Dirty Mac', johnLennon, keithRichards, Musician('Eric Clapton'),
+    #                      Musician('Mitch Mitchell'), formed=1968, split=1968)
+    # catalog = BandCatalog([the_beatles, the_rolling_stones, faces, the_dirty_mac])
+    # print([band.name for band in catalog.get_bands(ronWood)])
+    # print(sorted(m.name for m in catalog.get_collaborators(keithRichards)))
+    # print(' - '.join(x.name for x in catalog.get_connection(Musician('Rod Stewart'), paulMcCartney)))
+    # print()
+
+    # # The same queries on 200k bands with 1M memberships (scanning all the bands vs. the reverse index)
+    # import random
+    # import timeit
+    # musicians = [Musician(f'Musician {i}') for i in range(300_000)]
+    # bands = [Band(f'Band {i}', *random.sample(musicians, 5), formed=random.randint(1960, 2020))
+    #          for i in range(200_000)]
+    # start = timeit.default_timer()
+    # catalog = BandCatalog(bands)
+    # print(f'building the catalog: {(timeit.default_timer() - start) * 1000:.0f} ms')
+    # m = musicians[12345]
+    # print(f'bands of a musician, scan: {timeit.timeit(lambda: [b for b in bands if m in b.members], number=1) * 1000:.1f} ms, '
+    #       f'index: {timeit.timeit(lambda: catalog.get_bands(m), number=1000):.3f} ms')
+    # print(f'collaborators: {timeit.timeit(lambda: catalog.get_collaborators(m), number=1000):.3f} ms')
+    # start = timeit.default_timer()
+    # path = catalog.get_connection(musicians[1], musicians[2])
+    # print(f'connection ({(len(path) - 1) // 2 if path else None} bands): '
+    #       f'{(timeit.default_timer() - start) * 1000:.1f} ms')
+    # print()
+
+    # # Parse a dump of 100k band strings (the legacy split chain and Band.parse_band_str(), one band string at a time,
+    # # vs. parse_bands())
+    # import time
+    # def legacy_parse_band_str(band_str):
+    #     name, *members_str, rest1 = band_str.split('\n\t')
+    #     last_member, formed_str, split_str = rest1.split('\n')
+    #     members_str.append(last_member)
+    #     members = [Musician.from_str(member) for member in members_str]
+    #     return name, members, int(formed_str[-5:-1]), int(split_str[-5:-1])
+    # bands = [Band(f'Band {i}', *[Musician(f'Musician {i}-{j}') for j in range(4)], formed=1960 + i % 40, split=2000)
+    #          for i in range(100_000)]
+    # band_strs = [str(band) for band in bands]
+    # dump = '\n'.join(band_strs)
+    # print(f'dump: {len(dump) / 1e6:.1f} MB')
+    # start = time.perf_counter()
+    # parsed = [Band(name, *members, formed=formed, split=split)
+    #           for name, members, formed, split in map(legacy_parse_band_str, band_strs)]
+    # print(f'split chain (pre-split band strings): {time.perf_counter() - start:.2f} s, {parsed == bands}')
+    # start = time.perf_counter()
+    # parsed = [Band(name, *members, formed=formed, split=split)
+    #           for name, members, formed, split in map(Band.parse_band_str, band_strs)]
+    # print(f'Band.parse_band_str() (pre-split band strings): {time.perf_counter() - start:.2f} s, {parsed == bands}')
+    # start = time.perf_counter()
+    # parsed = list(parse_bands(dump))
+    # print(f'parse_bands(): {time.perf_counter() - start:.2f} s, '
+    #       f'{len(dump) / 1e6 / (time.perf_counter() - start):.1f} MB/s, {parsed == bands}')
+    # print()
+
     # # Demonstrate JSON encoding/decoding of Band objects
     # Single object
     # the_beatles = Band('The Beatles', *[johnLennon, paulMcCartney, georgeHarrison, ringoStarr],
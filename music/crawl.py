@@ -2,26 +2,704 @@
 BeautifulSoup documentation: https://www.crummy.com/software/BeautifulSoup/bs4/doc/
 """
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from functools import lru_cache, partial
+import csv
+import hashlib
+import json
+import os
+from pathlib import Path
+import re
+import socket
+import sys
+import threading
+import time
+import unicodedata
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+from urllib3.util.retry import Retry
 
 from util import utility
 
 BASE_URL = 'https://www.imdb.com/'
+MOVIES_CSV_HEADER = ['Title', 'Year', 'Link', 'Poster']
 
 
-def get_soup(url: str) -> BeautifulSoup:
-    """Returns BeautifulSoup object from the corresponding URL, passed as a string.
+class CrawlSession:
+    """The class describing an HTTP session shared by all the requests of a crawl.
+    It owns a requests.Session whose connection pool keeps connections to each host alive between requests,
+    so that the TCP/TLS connection setup is paid once per host, not once per page.
+    Failed requests (connection errors and 429/5xx responses) are retried with exponential backoff.
+    Parameters:
+    - pool_size: the max number of connections kept alive per host (should be >= the number of crawl workers)
+    - retries: the max number of retries of a failed request
+    - backoff_factor: the base of the exponential backoff between retries, in seconds
+    - timeout: the (connect, read) timeouts of each request, in seconds
+    - keep_alive: if False, the connections are closed after each response
+    - scheduler: an optional CrawlScheduler object that paces the requests to each host;
+      with a scheduler, 429/503 responses are not retried by the connection pool,
+      but passed to the scheduler (to slow down) and then retried after the pause it imposes
+    With or without a scheduler, once the retries are exhausted, get() returns the last response, whatever its status
+    (it does not raise requests.exceptions.RetryError), so the callers must check the status of the response.
+    """
+
+    retry_statuses = (429, 500, 502, 503, 504)
+
+    def __init__(self, pool_size=10, retries=3, backoff_factor=0.5, timeout=(3.05, 30), keep_alive=True,
+                 scheduler=None):
+        self.timeout = timeout
+        self.retries = retries
+        self.scheduler = scheduler
+        self.session = requests.Session()
+        retry_statuses = [status for status in CrawlSession.retry_statuses
+                          if not (scheduler and status in CrawlScheduler.throttle_statuses)]
+        retry = Retry(total=retries, backoff_factor=backoff_factor,
+                      status_forcelist=retry_statuses, allowed_methods=('GET', 'HEAD'),
+                      respect_retry_after_header=not scheduler, raise_on_status=False)
+        adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+    def get(self, url, **kwargs):
+        """Sends an HTTP GET request over a pooled connection and returns the Response object.
+        Like get_soup(), it assumes that no redirection is allowed, unless specified otherwise in kwargs.
+        """
+
+        kwargs.setdefault('allow_redirects', False)
+        kwargs.setdefault('timeout', self.timeout)
+        if not self.scheduler:
+            return self.send(url, **kwargs)
+
+        record = get_current_record()
+        for _ in range(self.retries + 1):
+            start = time.perf_counter()
+            self.scheduler.acquire(url, self.session)
+            if record:
+                record.throttle += time.perf_counter() - start
+            response = None
+            try:
+                response = self.send(url, **kwargs)
+            finally:
+                self.scheduler.release(url, response)
+            if response.status_code not in CrawlScheduler.throttle_statuses:
+                break
+        return response
+
+    def send(self, url, **kwargs):
+        """Sends a single HTTP GET request (no scheduling) and records its timings (see CrawlMetrics).
+        """
+
+        start = time.perf_counter()
+        response = self.session.get(url, **kwargs)
+        note_response(response, time.perf_counter() - start)
+        return response
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class TimedConnection:
+    """Mixin for urllib3 connection classes, which adds the time of the DNS lookup and of the connection setup
+    (TCP connect, plus the TLS handshake for HTTPS) of each new connection to the current PageMetrics object, if any.
+    The host name is resolved only once, timed as the DNS lookup; then urllib3 connects to the resolved addresses
+    (numeric, so they need no further lookup) one after another, until one of them accepts the connection,
+    the same way it tries all the addresses when it resolves the name itself. The connection setup time is the time
+    of connect() without the DNS lookup.
+    """
+
+    def connect(self):
+        record = get_current_record()
+        if not record:
+            return super().connect()
+        start = time.perf_counter()
+        dns = record.dns
+        super().connect()                               # calls _new_conn(), which adds the lookup to record.dns
+        record.connect += time.perf_counter() - start - (record.dns - dns)
+
+    def _new_conn(self):
+        record = get_current_record()
+        if not record:
+            return super()._new_conn()
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        finally:
+            record.dns += time.perf_counter() - start
+        host = self._dns_host
+        try:
+            for i, (*_, address) in enumerate(addresses, 1):
+                self._dns_host = address[0]
+                try:
+                    return super()._new_conn()
+                except (ConnectTimeoutError, NewConnectionError):
+                    if i == len(addresses):
+                        raise
+        finally:
+            self._dns_host = host
+
+
+class TimedHTTPConnection(TimedConnection, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnection, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools time the DNS lookup and connection setup of their connections.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool,
+                                                   'https': TimedHTTPSConnectionPool}
+
+
+class PageMetrics:
+    """The class describing the cost of getting and processing a single page of a crawl (times are in seconds):
+    - status, size: the HTTP status of the (last) response and the number of bytes received (or read from the cache)
+    - cached: whether the page was taken from a ResponseCache object
+    - dns, connect: the time of the DNS lookup and of the connection setup (0 if a pooled connection was reused;
+      measured only for the requests sent with a CrawlSession object)
+    - elapsed: the time from sending the request to receiving the response headers (includes dns and connect)
+    - transfer: the time of receiving the response body
+    - throttle: the time spent waiting for a CrawlScheduler object
+    - fetch: the total time of getting the page (get_page())
+    - parse, extract: the time of parsing the page and of extracting the movies from it
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.status = None
+        self.size = 0
+        self.cached = False
+        self.dns = 0.0
+        self.connect = 0.0
+        self.elapsed = 0.0
+        self.transfer = 0.0
+        self.throttle = 0.0
+        self.fetch = 0.0
+        self.parse = 0.0
+        self.extract = 0.0
+
+    @property
+    def wait(self):
+        """The time the server took to respond (time to the response headers, without the connection setup).
+        """
+
+        return max(0.0, self.elapsed - self.dns - self.connect)
+
+    def to_dict(self):
+        d = self.__dict__.copy()
+        d['wait'] = self.wait
+        return d
+
+
+class CrawlMetrics:
+    """The class describing the instrumentation of a crawl: it collects a PageMetrics object per page (by URL).
+    It is passed as the metrics parameter to get_soup(), crawl(), get_m_info() etc.
+    The totals are available from summary() (and str()), and the per-page records and the summary
+    can be appended to a JSON Lines file (write_json_lines()), to track crawl throughput over time.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.started = self.finished = time.perf_counter()
+        self.pages = {}
+        self.lock = threading.Lock()
+
+    def get_page(self, url):
+        """Returns the PageMetrics object of the page at url, creating it on first use.
+        """
+
+        with self.lock:
+            if url not in self.pages:
+                self.pages[url] = PageMetrics(url)
+            return self.pages[url]
+
+    @contextmanager
+    def timing(self, url, field=None):
+        """Context manager that adds the time spent in its body to the field of the PageMetrics object of url,
+        and yields that object.
+        """
+
+        record = self.get_page(url)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self.finished = time.perf_counter()
+            if field:
+                setattr(record, field, getattr(record, field) + self.finished - start)
+
+    def summary(self):
+        """Returns a dictionary with the totals of all the page metrics, crawl throughput,
+        and whether the crawl was network-bound or parse-bound (comparing the total fetch time,
+        summed over pages, with the total parse and extraction time).
+        """
+
+        pages = list(self.pages.values())
+        wall_time = self.finished - self.started
+        totals = {field: sum(getattr(p, field) for p in pages)
+                  for field in ('dns', 'connect', 'wait', 'transfer', 'throttle', 'fetch', 'parse', 'extract')}
+        size = sum(p.size for p in pages)
+        return {'started_at': self.started_at,
+                'pages': len(pages),
+                'cached_pages': sum(p.cached for p in pages),
+                'bytes': size,
+                'wall_time': wall_time,
+                'pages_per_second': len(pages) / wall_time if wall_time else 0.0,
+                'bytes_per_second': size / wall_time if wall_time else 0.0,
+                **totals,
+                'bound': 'network' if totals['fetch'] > totals['parse'] + totals['extract'] else 'parse'}
+
+    def to_json_lines(self):
+        """Returns the page metrics and the summary as JSON Lines (one JSON object per line, the summary last).
+        """
+
+        lines = [json.dumps({'type': 'page', 'started_at': self.started_at, **p.to_dict()})
+                 for p in self.pages.values()]
+        lines.append(json.dumps({'type': 'summary', **self.summary()}))
+        return '\n'.join(lines) + '\n'
+
+    def write_json_lines(self, file):
+        """Appends the page metrics and the summary to file, as JSON Lines.
+        """
+
+        with open(file, 'a', encoding='utf-8') as f:
+            f.write(self.to_json_lines())
+
+    def __str__(self):
+        s = self.summary()
+        return f'{s["pages"]} pages ({s["cached_pages"]} cached), {s["bytes"]} bytes in {s["wall_time"]:.2f} s ' \
+               f'({s["pages_per_second"]:.2f} pages/s); ' \
+               f'dns {s["dns"]:.2f} s, connect {s["connect"]:.2f} s, wait {s["wait"]:.2f} s, ' \
+               f'transfer {s["transfer"]:.2f} s, throttle {s["throttle"]:.2f} s, fetch {s["fetch"]:.2f} s, ' \
+               f'parse {s["parse"]:.2f} s, extract {s["extract"]:.2f} s; {s["bound"]}-bound'
+
+
+# The PageMetrics object of the page that the current thread is getting (set by get_page(), if instrumented)
+current_page = threading.local()
+
+
+def get_current_record():
+    return getattr(current_page, 'record', None)
+
+
+def note_response(response, duration):
+    """Adds the size and timings of response, whose request took duration seconds in total,
+    to the current PageMetrics object, if any.
+    """
+
+    record = get_current_record()
+    if record:
+        elapsed = response.elapsed.total_seconds()
+        record.status = response.status_code
+        record.size += len(response.content)
+        record.elapsed += elapsed
+        record.transfer += max(0.0, duration - elapsed)
+
+
+def send_get(url, session=None, **kwargs):
+    """Sends an HTTP GET request with the CrawlSession object passed as session,
+    or with requests.get(<url string>, allow_redirects=False), and returns the Response object.
+    """
+
+    if session:
+        return session.get(url, **kwargs)
+    start = time.perf_counter()
+    response = requests.get(url, allow_redirects=False, **kwargs)
+    note_response(response, time.perf_counter() - start)
+    return response
+
+
+class CrawlScheduler:
+    """The class describing a polite crawl scheduler, which makes large crawls go as fast as each host allows,
+    and never faster. For each host, it keeps:
+    - a token bucket, which lets through at most rate requests per second (with bursts of up to burst requests)
+    - a limit of max_concurrency requests in progress at the same time
+    - the host's robots.txt (fetched once and cached for robots_ttl seconds); the URLs it disallows are not requested,
+      and its Crawl-delay, if any, caps the rate; if robots.txt cannot be fetched (a network error or a 5xx response),
+      everything is disallowed, and robots.txt is fetched again after robots_retry seconds
+    The rate adapts to the host: it is halved after each 429/503 response (down to min_rate),
+    and the host is paused for as long as its Retry-After header says;
+    after each successful response, it grows back by rate_increase, up to the initial rate (AIMD).
+    It is used through a CrawlSession object, e.g. CrawlSession(scheduler=CrawlScheduler(rate=2)).
+    """
+
+    throttle_statuses = (429, 503)
+
+    def __init__(self, rate=1.0, burst=1, max_concurrency=2, min_rate=0.05, rate_increase=0.05,
+                 user_agent='*', robots_ttl=24 * 60 * 60, robots_retry=60):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_rate = min_rate
+        self.rate_increase = rate_increase
+        self.user_agent = user_agent
+        self.robots_ttl = robots_ttl
+        self.robots_retry = robots_retry
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def get_host(self, url):
+        """Returns the state of the host of url (a HostState object), creating it on the first request to the host.
+        """
+
+        parts = urlsplit(url)
+        host = f'{parts.scheme}://{parts.netloc}'
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostState(host, self.rate, self.burst, self.max_concurrency)
+            return self.hosts[host]
+
+    def get_robots(self, host, session=None):
+        """Returns the RobotFileParser object for the host's robots.txt, fetching it if it is not cached (or is stale).
+        If robots.txt does not exist (a 4xx response other than 401 and 403), everything is allowed.
+        If it cannot be fetched (a network error or a 5xx response, e.g. from a throttling host) or access to it
+        is denied (401, 403), everything is disallowed, as in RFC 9309 and RobotFileParser.read(); a failed fetch is
+        cached only for robots_retry seconds.
+        """
+
+        with host.robots_lock:                      # fetch robots.txt only once, even with concurrent requests
+            if host.robots and time.time() < host.robots_expires:
+                return host.robots
+            robots = RobotFileParser(host.name + '/robots.txt')
+            try:
+                response = (session or requests).get(robots.url, timeout=10)
+                status = response.status_code
+                lines = response.text.splitlines() if status == 200 else []
+            except requests.RequestException:
+                status, lines = None, []
+            if status is None or status >= 500 or status in (401, 403):
+                robots.disallow_all = True
+            else:
+                robots.parse(lines)
+            robots.modified()
+            failed = status is None or status >= 500
+            host.robots_expires = robots.mtime() + (self.robots_retry if failed else self.robots_ttl)
+            delay = robots.crawl_delay(self.user_agent)
+            with host.lock:
+                if delay:
+                    host.max_rate = min(host.max_rate, 1 / float(delay))
+                    host.rate = min(host.rate, host.max_rate)
+            host.robots = robots
+            return robots
+
+    def acquire(self, url, session=None):
+        """Waits until a request to url may be sent: the URL must be allowed by robots.txt,
+        there must be a free concurrency slot for the host, and a token in the host's bucket.
+        Raises RobotsDisallowedError if robots.txt disallows the URL.
+        Each acquire() must be followed by release(), after the request.
+        """
+
+        host = self.get_host(url)
+        if not self.get_robots(host, session).can_fetch(self.user_agent, url):
+            raise RobotsDisallowedError(url)
+        host.slots.acquire()
+        while True:
+            with host.lock:
+                now = time.monotonic()
+                host.tokens = min(self.burst, host.tokens + (now - host.updated) * host.rate)
+                host.updated = now
+                wait = max(host.paused_until - now, (1 - host.tokens) / host.rate)
+                if wait <= 0:
+                    host.tokens -= 1
+                    return
+            time.sleep(wait)
+
+    def release(self, url, response=None):
+        """Frees the concurrency slot taken by acquire(), and adapts the host's rate to the response (if any).
+        """
+
+        host = self.get_host(url)
+        host.slots.release()
+        if response is None:
+            return
+        with host.lock:
+            if response.status_code in CrawlScheduler.throttle_statuses:
+                host.rate = max(self.min_rate, host.rate / 2)
+                host.tokens = min(host.tokens, 0)
+                retry_after = get_retry_after(response)
+                if retry_after:
+                    host.paused_until = max(host.paused_until, time.monotonic() + retry_after)
+            elif response.ok:
+                host.rate = min(host.max_rate, host.rate + self.rate_increase)
+
+
+class HostState:
+    """The class describing the state of a host, as seen by a CrawlScheduler object.
+    """
+
+    def __init__(self, name, rate, burst, max_concurrency):
+        self.name = name
+        self.rate = rate
+        self.max_rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.robots = None
+        self.robots_expires = 0
+        self.robots_lock = threading.Lock()
+        self.lock = threading.Lock()
+
+
+def get_retry_after(response):
+    """Returns the number of seconds from the Retry-After header of response (given in seconds or as a date),
+    or None if there is no such header or it cannot be parsed.
+    """
+
+    retry_after = response.headers.get('Retry-After')
+    if not retry_after:
+        return None
+    if retry_after.strip().isdigit():
+        return int(retry_after)
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CrawlError(Exception):
+    """Base class for exceptions in this module.
+    """
+
+    pass
+
+
+class PageStatusError(CrawlError):
+    """Exception raised when a page is fetched with an HTTP status other than 200 OK (e.g. 404, 429 or 5xx,
+    after the retries), so that an error page is never mistaken for a page with no movies.
+    """
+
+    def __init__(self, url, status):
+        self.url = url
+        self.status = status
+        self.message = f'{url} returned HTTP status {status}'
+        super().__init__(self.message)
+
+
+class RobotsDisallowedError(CrawlError):
+    """Exception raised when the host's robots.txt does not allow crawling a URL.
+    """
+
+    def __init__(self, url):
+        self.message = f'robots.txt disallows crawling {url}'
+        super().__init__(self.message)
+
+
+class ResponseCache:
+    """The class describing an on-disk cache of HTTP responses (HTML pages), keyed by URL.
+    Each page is stored under the cache directory as <sha256 of the URL>.html, next to a <sha256 of the URL>.json file
+    with its URL, ETag, Last-Modified header and the time when it was fetched.
+    A cached page is used without contacting the server while it is younger than ttl seconds;
+    after that, it is revalidated with a conditional GET request (If-None-Match/If-Modified-Since),
+    and reused if the server responds with 304 Not Modified.
+    When the cached pages take more than max_size bytes, the least recently used ones are evicted
+    (the modification time of a page file is its last access time). The total size of the pages is counted
+    when the cache is opened and then kept up to date as pages are written, so the directory is only scanned
+    when pages need to be evicted.
+    """
+
+    def __init__(self, cache_dir=None, ttl=24 * 60 * 60, max_size=100 * 2 ** 20):
+        self.cache_dir = Path(cache_dir) if cache_dir else utility.get_data_dir() / 'cache'
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.size_lock = threading.Lock()
+        self.size = sum(page_file.stat().st_size for page_file in self.get_files('*.html'))
+
+    cache_file_regex = re.compile(r'[0-9a-f]{64}\.')
+
+    def get_files(self, pattern):
+        """Returns the list of the files in the cache directory that match pattern and are named like the cache files
+        (starting with a sha256 key), so that other files in the same directory are never counted or removed.
+        """
+
+        return [file for file in self.cache_dir.glob(pattern) if ResponseCache.cache_file_regex.match(file.name)]
+
+    def get_paths(self, url):
+        """Returns the Path objects of the page file and the metadata file corresponding to url.
+        """
+
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.cache_dir / (key + '.html'), self.cache_dir / (key + '.json')
+
+    def get_text(self, url, session=None):
+        """Returns the text of the page at url, from the cache if possible, otherwise from the network.
+        The network request is sent with the CrawlSession object passed as session, or with requests.get().
+        Raises PageStatusError if the page is not in the cache and the response status is not 200 OK.
+        """
+
+        page_file, meta_file = self.get_paths(url)
+        try:
+            meta = json.loads(meta_file.read_text(encoding='utf-8'))
+            text = page_file.read_text(encoding='utf-8')
+        except (FileNotFoundError, ValueError):
+            meta, text = {}, None
+
+        if text is not None and time.time() - meta['fetched'] < self.ttl:
+            os.utime(page_file)
+            self.note_hit(page_file)
+            return text
+
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        response = send_get(url, session, headers=headers)
+
+        if response.status_code == 304 and text is not None:
+            meta['fetched'] = time.time()
+            self.write_file(meta_file, json.dumps(meta))
+            os.utime(page_file)
+            self.note_hit(page_file)
+            return text
+
+        if response.status_code != 200:
+            raise PageStatusError(url, response.status_code)
+        text = response.text
+        meta = {'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched': time.time()}
+        old_size = page_file.stat().st_size if page_file.exists() else 0
+        self.write_file(page_file, text)
+        self.write_file(meta_file, json.dumps(meta))
+        with self.size_lock:
+            self.size += page_file.stat().st_size - old_size
+            if self.size > self.max_size:
+                self.evict()
+        return text
+
+    @staticmethod
+    def note_hit(page_file):
+        """Records in the current PageMetrics object, if any, that the page was taken from the cache.
+        """
+
+        record = get_current_record()
+        if record:
+            record.cached = True
+            record.size += page_file.stat().st_size
+
+    @staticmethod
+    def write_file(file, text):
+        """Writes text to file atomically, so that concurrent readers never see a partially written file.
+        """
+
+        tmp_file = file.with_name(f'{file.name}.{os.getpid()}.{time.monotonic_ns()}.tmp')
+        tmp_file.write_text(text, encoding='utf-8')
+        os.replace(tmp_file, file)
+
+    def evict(self):
+        """Removes the least recently used pages from the cache until they take no more than max_size bytes,
+        and recounts the total size of the pages (which may have been changed by other processes).
+        """
+
+        pages = []
+        for page_file in self.get_files('*.html'):
+            try:
+                stat = page_file.stat()
+            except FileNotFoundError:
+                continue
+            pages.append((stat.st_mtime, stat.st_size, page_file))
+        total_size = sum(size for _, size, _ in pages)
+        for _, size, page_file in sorted(pages):
+            if total_size <= self.max_size:
+                break
+            page_file.unlink(missing_ok=True)
+            page_file.with_suffix('.json').unlink(missing_ok=True)
+            total_size -= size
+        self.size = total_size
+
+    def clear(self):
+        """Removes the cached pages, their metadata and any leftover temporary files (and no other files,
+        in case the cache directory is shared with other data, e.g. get_data_dir()).
+        """
+
+        for pattern in ('*.html', '*.json', '*.tmp'):
+            for file in self.get_files(pattern):
+                file.unlink(missing_ok=True)
+        with self.size_lock:
+            self.size = 0
+
+
+def get_page(url: str, session=None, cache=None, metrics=None) -> str:
+    """Returns the text (HTML) of the page at the corresponding URL, passed as a string.
     Creates Response object from HTTP GET request, using requests.get(<url string>, allow_redirects=False),
-    and then uses the text field of the Response object and the 'html.parser' to create the BeautifulSoup object.
+    or the get() method of the CrawlSession object passed as session (to reuse pooled connections),
+    and returns the text field of the Response object.
+    If a ResponseCache object is passed as cache, the page is taken from the cache whenever possible.
+    If a CrawlMetrics object is passed as metrics, the size and timings of getting the page are recorded in it.
+    Raises PageStatusError if the page cannot be fetched with the status 200 OK (after the retries, see CrawlSession).
     """
 
+    if not metrics:
+        return get_page_text(url, session, cache)
+    with metrics.timing(url, 'fetch') as record:
+        previous, current_page.record = get_current_record(), record
+        try:
+            return get_page_text(url, session, cache)
+        finally:
+            current_page.record = previous
+
+
+def get_page_text(url, session=None, cache=None):
+    if cache:
+        return cache.get_text(url, session)
     # Create Response object from HTTP GET request; assume that no redirection is allowed (allow_redirects=False)
-    response = requests.get(url, allow_redirects=False)
+    response = send_get(url, session)
+    if response.status_code != 200:
+        raise PageStatusError(url, response.status_code)
     # Get text from the Response object, using <response>.text
-    response_text = response.text
-    # Create and return the corresponding BeautifulSoup object from the response text; use 'html.parser'
-    return BeautifulSoup(response_text, 'html.parser')
+    return response.text
+
+
+def get_soup(url: str, session=None, cache=None, parser='html.parser', metrics=None) -> BeautifulSoup:
+    """Returns BeautifulSoup object from the corresponding URL, passed as a string.
+    Gets the text of the page using get_page() (see there for the session, cache and metrics parameters),
+    and then uses the parser (by default, 'html.parser') to create the BeautifulSoup object.
+    """
+
+    page = get_page(url, session, cache, metrics)
+    if not metrics:
+        # Create and return the corresponding BeautifulSoup object from the response text
+        return BeautifulSoup(page, parser)
+    with metrics.timing(url, 'parse'):
+        return BeautifulSoup(page, parser)
 
 
 def get_specific_page(start_url: str, page=1):
@@ -35,93 +713,378 @@ def get_specific_page(start_url: str, page=1):
         return start_url
 
 
-def get_next_soup(start_url: str, page=1):
+def get_next_page(start_url: str, page=1, session=None, cache=None, metrics=None):
+    """Returns the text (HTML) of a specific page in case there are multiple pages that list objects of interest.
+    The parameters are the same as in get_next_soup().
+    """
+
+    return get_page(get_specific_page(start_url, page), session, cache, metrics)
+
+
+def get_next_soup(start_url: str, page=1, session=None, cache=None, metrics=None):
     """Returns the BeautifulSoup object corresponding to a specific page
     in case there are multiple pages that list objects of interest.
     Parameters:
     - start_url: the starting page/url of a multi-page list of objects
     - page: the page number of a specific page of a multi-page list of objects
+    - session: an optional CrawlSession object to send the request with
+    - cache: an optional ResponseCache object to take the page from
+    - metrics: an optional CrawlMetrics object to record the size and timings of the page in
     """
 
-    return get_soup(get_specific_page(start_url, page))
+    return get_soup(get_specific_page(start_url, page), session, cache, metrics=metrics)
 
 
-def crawl(url: str, max_pages=1):
+def crawl(url: str, max_pages=1, workers=1, session=None, cache=None, metrics=None):
     """Web crawler that collects info about movies from IMDb,
     implemented as a Python generator that yields BeautifulSoup objects (get_next_soup()) from multi-page movie lists.
-    Parameters: the url of the starting IMDb page and the max number of pages to crawl in case of multi-page lists.
+    Parameters: the url of the starting IMDb page, the max number of pages to crawl in case of multi-page lists,
+    the number of worker threads that fetch pages concurrently (workers=1 means one page after another),
+    an optional CrawlSession object whose pooled connections are reused for all the pages,
+    an optional ResponseCache object that the pages are taken from whenever possible,
+    and an optional CrawlMetrics object to record the size, fetch and parse timings of each page in.
+    The soups are always yielded in page order, regardless of the number of workers.
+    """
+
+    for p, page in enumerate(crawl_pages(url, max_pages, workers, session, cache, metrics=metrics), 1):
+        if not metrics:
+            yield BeautifulSoup(page, 'html.parser')
+            continue
+        with metrics.timing(get_specific_page(url, p), 'parse'):
+            soup = BeautifulSoup(page, 'html.parser')
+        yield soup
+
+
+def crawl_pages(url: str, max_pages=1, workers=1, session=None, cache=None, start_page=1, metrics=None):
+    """Like crawl(), but yields the text (HTML) of the pages instead of BeautifulSoup objects,
+    so that the pages can be parsed with any parser backend (see extract_movies()).
+    The crawl can start from a page other than the first one (start_page), e.g. to resume an interrupted crawl.
+    """
+
+    if workers <= 1:
+        for p in range(start_page, max_pages + 1):
+            yield get_next_page(url, p, session, cache, metrics)
+    else:
+        yield from crawl_concurrently(url, max_pages, workers, session, cache, start_page, metrics)
+
+
+def crawl_concurrently(url: str, max_pages=1, workers=4, session=None, cache=None, start_page=1, metrics=None):
+    """Generator that yields the text (HTML) of the pages of multi-page movie lists in page order,
+    fetching up to workers pages at a time in a thread pool.
+    The pool is bounded: a new page is submitted only when the oldest pending one has been taken,
+    so no more than workers pages are ever fetched ahead of the consumer.
+    If a CrawlSession object is passed as session, its pool_size should be at least workers.
+    """
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        yield from map_in_order(executor, lambda page: get_next_page(url, page, session, cache, metrics),
+                                range(start_page, max_pages + 1), workers)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def map_in_order(executor, fn, items, window):
+    """Generator that yields fn(item) for each item from items, in order, computing them in executor (a thread or
+    process pool). No more than window items are submitted ahead of the consumer, so items can be a long iterator.
     """
 
-    for p in range(max_pages):
-        yield get_next_soup(url, p + 1)
-        p += 1
+    pending = deque()
+    items = iter(items)
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) == window:
+            break
+    while pending:
+        result = pending.popleft().result()
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            break
+        yield result
+
+
+def get_non_decimal_digits():
+    """Returns the characters for which str.isdigit() is True, but which are not decimal digits (\\d), e.g. '²' and '①',
+    as the body of a regex character class.
+    They are all in the Unicode category No, and are read from unicodedata, so they follow the Unicode version
+    of the running Python.
+    """
+    characters = [c for c in map(chr, range(sys.maxunicode + 1))
+                  if c.isdigit() and unicodedata.category(c) == 'No']
+    return ''.join(f'\\U{ord(c):08x}' for c in characters)
+
+
+@lru_cache(maxsize=None)
+def get_4_digit_regex():
+    """Returns the compiled regular expressions that find 4-digit substrings,
+    as a tuple (<one string>, <first 4-digit substring on each line of a multi-line string>).
+    A digit is any character for which str.isdigit() is True: a Unicode decimal digit (\\d, which includes, e.g.,
+    Arabic-Indic digits) or one of get_non_decimal_digits(), so that the results are the same as with str.isdigit().
+    The character class is built once, on the first call.
+    """
+    digit = f'[\\d{get_non_decimal_digits()}]'
+    return re.compile(f'{digit}{{4}}'), re.compile(f'^.*?({digit}{{4}})|^', re.MULTILINE)
 
 
 def get_4_digit_substring(a_string):
     """Returns the first 4-digit substring from a_string.
     It assumes that a_string contains a 4-digit substring representing a year.
-    Useful when the year of a movie release on IMDb is represented like '(1988, part 2)', or '(video, 2002)'."""
-
-    if len(a_string) >=4:
-        # all_4_digit_substrings = [a_string[i:j]
-        #                           for i in range(0, len(a_string) - 3)
-        #                           for j in range(i + 1, len(a_string) + 1)
-        #                           if len(a_string[i:j]) == 4]
-        all_4_digit_substrings = [a_string[i:(i+4)] for i in range(0, len(a_string) - 3)]
-        first_4_digit_substring = next((x for x in all_4_digit_substrings if x.isdigit()), None)
-        return first_4_digit_substring
-    else:
-        return None
+    Useful when the year of a movie release on IMDb is represented like '(1988, part 2)', or '(video, 2002)'.
+    Scans a_string once, with a compiled regular expression, instead of creating all of its 4-character substrings."""
+
+    # all_4_digit_substrings = [a_string[i:(i+4)] for i in range(0, len(a_string) - 3)]
+    # first_4_digit_substring = next((x for x in all_4_digit_substrings if x.isdigit()), None)
+    match = get_4_digit_regex()[0].search(a_string)
+    return match.group() if match else None
+
 
+def get_4_digit_substrings(strings):
+    """Batch version of get_4_digit_substring(): returns the list of the first 4-digit substrings
+    (or None) from all the strings in strings, e.g. from the whole column of movie years.
+    The strings are joined into one multi-line string and scanned with a single regex call;
+    if some of the strings contain newlines, they are scanned one by one.
+    """
+
+    strings = list(strings)
+    if not strings:
+        return []
+    joined = '\n'.join(strings)
+    if joined.count('\n') != len(strings) - 1:
+        return [get_4_digit_substring(s) for s in strings]
+    return [year if year else None for year in get_4_digit_regex()[1].findall(joined)]
 
-def get_m_info(start_url: str, max_pages=1):
+
+def get_movie_info(title, year, href, poster):
+    """Returns the 4-tuple of info-items about a movie (title, year, link, poster)
+    from the raw strings found in a 'lister-item' block of an IMDb movie list.
+    """
+
+    title = title.strip()                           # some titles contain leading/trailing whitespace
+    year = get_4_digit_substring(year) if year else None
+    year = 'unknown' if not year else year          # covers the case when get_4_digit_substring(year) returns None
+    link = BASE_URL + href[1:]
+    return title, year, link, poster
+
+
+def extract_movies_bs4(page: str, parser='html.parser', record=None):
+    """Returns the list of 4-tuples of info-items about the movies from the text (HTML) of an IMDb movie list page,
+    using BeautifulSoup with the parser given as parser (e.g. 'html.parser' or 'lxml').
+    Only the movie list ('lister-list') is parsed into the tree (SoupStrainer),
+    and each 'lister-item' block is processed once, so that its title, year, link and poster stay together.
+    If a PageMetrics object is passed as record, the parse and extraction times are added to it.
+    """
+
+    start = time.perf_counter()
+    soup = BeautifulSoup(page, parser, parse_only=SoupStrainer(class_='lister-list'))
+    parsed = time.perf_counter()
+    movies = []
+    for item in soup.select('div.lister-item'):
+        h3 = item.h3
+        year = h3.find('span', {'class': 'lister-item-year'})
+        img = item.select_one('div.lister-item-image img')
+        movies.append(get_movie_info(h3.a.text, year.text if year else None, h3.a['href'],
+                                     img.get('loadlate') if img else None))
+    soup.decompose()                                # break the tree's reference cycles, to free it right away
+    if record:
+        record.parse += parsed - start
+        record.extract += time.perf_counter() - parsed
+    return movies
+
+
+def extract_movies_lxml(page: str, record=None):
+    """Returns the list of 4-tuples of info-items about the movies from the text (HTML) of an IMDb movie list page,
+    using the lxml.html parser (C-backed, much faster than BeautifulSoup) directly.
+    Each 'lister-item' block is processed once, so that its title, year, link and poster stay together.
+    If a PageMetrics object is passed as record, the parse and extraction times are added to it.
+    """
+
+    import lxml.html
+
+    start = time.perf_counter()
+    tree = lxml.html.fromstring(page)
+    parsed = time.perf_counter()
+    movies = []
+    for item in tree.find_class('lister-item'):
+        h3 = item.find('.//h3')
+        a = h3.find('a')
+        year = h3.find_class('lister-item-year')
+        img = item.xpath('.//div[contains(@class, "lister-item-image")]//img')
+        movies.append(get_movie_info(a.text_content(), year[0].text_content() if year else None, a.get('href'),
+                                     img[0].get('loadlate') if img else None))
+    if record:
+        record.parse += parsed - start
+        record.extract += time.perf_counter() - parsed
+    return movies
+
+
+# Parser backends of extract_movies(): parser name -> function that extracts movies from the text of a page
+PARSER_BACKENDS = {
+    'html.parser': extract_movies_bs4,
+    'bs4-lxml': partial(extract_movies_bs4, parser='lxml'),
+    'lxml': extract_movies_lxml,
+}
+
+
+def extract_movies(page: str, parser='html.parser', record=None):
+    """Returns the list of 4-tuples of info-items (title, year, link, poster) about the movies
+    from the text (HTML) of an IMDb movie list page, using the parser backend registered in PARSER_BACKENDS as parser.
+    If a movie has no poster, its poster is None.
+    If a PageMetrics object is passed as record, the parse and extraction times are added to it.
+    """
+
+    return PARSER_BACKENDS[parser](page, record=record)
+
+
+def extract_movies_timed(page: str, parser='html.parser'):
+    """Returns extract_movies(page, parser), together with the parse and extraction times,
+    as a 3-tuple (<list of 4-tuples about the movies>, <parse time>, <extraction time>).
+    Used as the task of the worker processes of the parsing stage, which return compact tuples, not parsed trees.
+    """
+
+    record = PageMetrics(None)
+    return extract_movies(page, parser, record), record.parse, record.extract
+
+
+def extract_movies_from_file(file, parser='html.parser'):
+    """Returns extract_movies() for the page saved in file (e.g. data/imdb.html, or a ResponseCache page file).
+    """
+
+    return extract_movies(Path(file).read_text(encoding='utf-8'), parser)
+
+
+def iter_m_info_from_files(files, parser='html.parser', processes=0):
+    """Generator that yields the 4-tuples (title, year, link, poster) about the movies from the archived pages
+    saved in files, in order, e.g. to reprocess thousands of pages from a ResponseCache directory.
+    If processes > 0, the files are read and parsed in that many worker processes (ProcessPoolExecutor),
+    so the parsing throughput scales with the number of cores; each worker returns only the extracted tuples.
+    """
+
+    if processes <= 0:
+        for file in files:
+            yield from extract_movies_from_file(file, parser)
+        return
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for movies in map_in_order(executor, partial(extract_movies_from_file, parser=parser), files, 2 * processes):
+            yield from movies
+
+
+def get_m_info(start_url: str, max_pages=1, workers=1, session=None, cache=None, parser='html.parser',
+               metrics=None, processes=0):
     """
     Returns structured information about movies from a multi-page IMDb movie list.
     :param start_url: the url of the starting page of a multi-page IMDb movie list
     :param max_pages: the max number of pages to crawl
+    :param workers: the number of pages to fetch concurrently (see crawl())
+    :param session: an optional CrawlSession object to send the requests with
+    :param cache: an optional ResponseCache object to take the pages from (a warm cache avoids the network)
+    :param parser: the parser backend to extract the movies with (see extract_movies(); 'lxml' is the fastest one)
+    :param metrics: an optional CrawlMetrics object to record the size, fetch, parse and extraction timings in
+    :param processes: if > 0, the pages are parsed in that many worker processes (a pipeline mode,
+                      in which the pages are fetched by threads and parsed on all the cores)
     :return: a list of tuples of info-items about the movies from a multi-page IMDb movie list
-    Creates and uses the following data:
-    - h3_list - a list of all 'h3' tags from multiple IMDb pages
-                (each 'h3' tag contains: movie title, year of release, and (relative) link to the movie's IMDb page)
-    - poster_list - a list of all relevant 'div' tags from multiple IMDb pages
-                    (each such a 'div' tag contains the link to the poster of the corresponding movie)
-    - info_list - a list of 3-tuples of information about each movie from h3_list
-    - poster_link_list - a list of links to the posters of the movies from poster_list
-    - complete_list - a list of 4-tuples of information about each movie from h3_list and poster_list
-    """
-
-    h3_list = []
-    poster_list = []
-    next__soup = crawl(start_url, max_pages)
-    while True:
-        try:
-            soup = next(next__soup)
-            h3_list.extend(soup.find_all('h3')[:-1])
-            poster_list.extend(soup.find_all('div', {'class': 'lister-item-image ribbonize'}))
-        except StopIteration:
-            break
+    Each page is processed in a single pass over its 'lister-item' blocks (each block contains
+    movie title, year of release, (relative) link to the movie's IMDb page, and the link to the movie's poster),
+    so that the 4-tuples stay correct even when a movie has no poster.
+    """
+
+    return list(iter_m_info(start_url, max_pages, workers, session, cache, parser, metrics, processes))
+
 
-    info_list = []
-    for h3 in h3_list:
-        title = h3.a.text.strip()                   # some titles contain leading/trailing whitespace
-        # year = h3.a.find_next_sibling('span').text[-5:-1]
-        # year = h3.a.find_next_sibling('span').text.split()[-1].lstrip('(').rstrip(')')
-        year = h3.find('span', {'class': "lister-item-year text-muted unbold"}).text
-        year = get_4_digit_substring(year)
-        year = 'unknown' if not year else year      # covers the case when get_4_digit_substring(year) returns None
-        link = BASE_URL + h3.a['href'][1:]
-        info_list.append((title, year, link))
+def iter_m_info(start_url: str, max_pages=1, workers=1, session=None, cache=None, parser='html.parser',
+                metrics=None, processes=0):
+    """Streaming version of get_m_info(), implemented as a Python generator
+    that yields the 4-tuples (title, year, link, poster) about the movies page by page, as the pages arrive.
+    Each page (and its parsed tree) is released as soon as its movies have been extracted,
+    so the memory used does not grow with the number of pages, and the consumer (e.g. a CSV writer)
+    can start processing the movies before the crawl is over.
+    The parameters are the same as in get_m_info().
+    """
+
+    pages = crawl_pages(start_url, max_pages, workers, session, cache, metrics=metrics)
+    if processes <= 0:
+        for p, page in enumerate(pages, 1):
+            yield from extract_page(page, parser, metrics, get_specific_page(start_url, p))
+        return
 
-    poster_link_list = []
-    for p in poster_list:
-        poster_link_list.append(p.a.img['loadlate'])
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        results = map_in_order(executor, partial(extract_movies_timed, parser=parser), pages, 2 * processes)
+        for p, (movies, parse_time, extract_time) in enumerate(results, 1):
+            if metrics:
+                with metrics.timing(get_specific_page(start_url, p)) as record:
+                    record.parse += parse_time
+                    record.extract += extract_time
+            yield from movies
 
-    complete_list = []
-    for info, p in zip(info_list, poster_link_list):
-        title, year, link = info
-        complete_list.append((title, year, link, p))
 
-    return complete_list
+def extract_page(page, parser, metrics, url):
+    """Returns extract_movies(page, parser), recording the parse and extraction times for url in metrics (if any).
+    """
+
+    if not metrics:
+        return extract_movies(page, parser)
+    with metrics.timing(url) as record:
+        return extract_movies(page, parser, record)
+
+
+def get_title_id(link: str):
+    """Returns the IMDb title ID (e.g. 'tt2066051') from the link to a movie's IMDb page.
+    """
+
+    return link.rstrip('/').rsplit('/', maxsplit=1)[-1]
+
+
+def export_m_info(start_url: str, csv_file, max_pages=1, checkpoint_file=None,
+                  workers=1, session=None, cache=None, parser='html.parser', metrics=None):
+    """Crawls a multi-page IMDb movie list and appends the movies to csv_file page by page, as the pages arrive.
+    After each page, the number of that page and the size of csv_file (with all its rows written to disk)
+    are recorded in checkpoint_file (by default, <csv_file>.checkpoint), so that an interrupted crawl is resumed
+    from the next page, instead of starting over, when export_m_info() is called again with the same start_url
+    and csv_file. On resuming, csv_file is first truncated to the recorded size, which removes a partially written
+    row left by a hard kill. A page that cannot be fetched (PageStatusError) stops the export before its checkpoint,
+    so that it is fetched again when the export is resumed.
+    The rows are deduplicated by IMDb title ID. To resume, only the title IDs of the rows already written to csv_file
+    are read back, not the rows themselves.
+    The other parameters are the same as in get_m_info().
+    Returns the number of rows written to csv_file in this call.
+    """
+
+    csv_file = Path(csv_file)
+    checkpoint_file = Path(checkpoint_file) if checkpoint_file else csv_file.with_name(csv_file.name + '.checkpoint')
+
+    last_page = 0
+    title_ids = set()
+    if checkpoint_file.exists() and csv_file.exists():
+        checkpoint = json.loads(checkpoint_file.read_text(encoding='utf-8'))
+        if checkpoint['start_url'] != start_url:
+            raise ValueError(f'{checkpoint_file} belongs to the crawl of {checkpoint["start_url"]}, not {start_url}')
+        last_page = checkpoint['last_page']
+        if 'csv_size' in checkpoint and csv_file.stat().st_size > checkpoint['csv_size']:
+            os.truncate(csv_file, checkpoint['csv_size'])
+        with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+            rows = csv.reader(f)
+            next(rows, None)                                        # skip the header row
+            title_ids.update(get_title_id(row[2]) for row in rows if len(row) > 2)
+
+    written = 0
+    # newline: avoid blank rows; encoding: enable ш,š...
+    with open(csv_file, 'a' if last_page else 'w', newline='', encoding='utf-8') as f:
+        out = csv.writer(f)
+        if not last_page:
+            out.writerow(MOVIES_CSV_HEADER)
+        pages = crawl_pages(start_url, max_pages, workers, session, cache, start_page=last_page + 1, metrics=metrics)
+        for page_number, page in enumerate(pages, last_page + 1):
+            for movie in extract_page(page, parser, metrics, get_specific_page(start_url, page_number)):
+                title_id = get_title_id(movie[2])
+                if title_id not in title_ids:
+                    title_ids.add(title_id)
+                    out.writerow(movie)
+                    written += 1
+            f.flush()
+            os.fsync(f.fileno())                                    # the rows are on disk before the checkpoint
+            ResponseCache.write_file(checkpoint_file, json.dumps({'start_url': start_url, 'last_page': page_number,
+                                                                  'csv_size': os.fstat(f.fileno()).st_size}))
+
+    return written
 
 
 if __name__ == "__main__":
@@ -261,13 +1224,118 @@ if __name__ == "__main__":
     #         break
     # print()
 
-    # Test get_m_info()
-    start_url = 'https://www.imdb.com/search/keyword/?keywords=rock-%27n%27-roll%2Crock-music&ref_=kw_ref_key&' \
-                'mode=detail&page=1&sort=moviemeter,asc'
-    movies = get_m_info(start_url, 3)
-    for m in movies:
-        print(m)
-    print()
+    # # Test crawl() with concurrent workers, against a local HTTP server that serves data/imdb.html for every page
+    # import threading
+    # import time
+    # from functools import partial
+    # from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+    #
+    # class SlowImdbHandler(SimpleHTTPRequestHandler):
+    #     def do_GET(self):
+    #         time.sleep(0.2)                                     # simulated round-trip time
+    #         self.path = '/imdb.html'
+    #         super().do_GET()
+    #
+    # server = ThreadingHTTPServer(('localhost', 0), partial(SlowImdbHandler, directory=str(utility.get_data_dir())))
+    # threading.Thread(target=server.serve_forever, daemon=True).start()
+    # local_url = f'http://localhost:{server.server_port}/search/?keywords=rock&mode=detail&page=1&sort=moviemeter,asc'
+    # for w in (1, 10):
+    #     t = time.perf_counter()
+    #     soups = list(crawl(local_url, 20, workers=w))
+    #     print(f'workers={w}: {len(soups)} pages in {time.perf_counter() - t:.2f} s')
+    # # The same, reusing pooled keep-alive connections
+    # with CrawlSession(pool_size=10) as session:
+    #     t = time.perf_counter()
+    #     soups = list(crawl(local_url, 20, workers=10, session=session))
+    #     print(f'workers=10, pooled session: {len(soups)} pages in {time.perf_counter() - t:.2f} s')
+    # # A polite crawl: at most 5 requests per second and 2 requests at a time to the host, obeying its robots.txt,
+    # # and slowing down when the host responds with 429/503
+    # with CrawlSession(scheduler=CrawlScheduler(rate=5, burst=2, max_concurrency=2)) as session:
+    #     t = time.perf_counter()
+    #     pages = list(crawl_pages(local_url, 20, workers=4, session=session))
+    #     print(f'polite crawl: {len(pages)} pages in {time.perf_counter() - t:.2f} s')
+    #     print({host: state.rate for host, state in session.scheduler.hosts.items()})
+    # # Instrument a crawl: is it network-bound or parse-bound?
+    # metrics = CrawlMetrics()
+    # with CrawlSession() as session:
+    #     movies = get_m_info(local_url, 5, workers=2, session=session, metrics=metrics)
+    # print(metrics)
+    # metrics.write_json_lines(utility.get_data_dir() / 'crawl_metrics.jsonl')
+    # # A warm on-disk cache makes repeated crawls run at parse speed
+    # cache = ResponseCache()
+    # for run in ('cold', 'warm'):
+    #     t = time.perf_counter()
+    #     movies = get_m_info(local_url, 5, cache=cache)
+    #     print(f'{run} cache: {len(movies)} movies in {time.perf_counter() - t:.2f} s')
+    # cache.clear()
+    # server.shutdown()
+    # print()
+
+    # # Benchmark the parser backends of extract_movies() on data/imdb.html,
+    # # against building a complete 'html.parser' soup and running find_all() over the whole document
+    # import timeit
+    # page = (utility.get_data_dir() / 'imdb.html').read_text(encoding='utf-8')
+    # def find_all_h3_and_posters():
+    #     soup = BeautifulSoup(page, 'html.parser')
+    #     return soup.find_all('h3')[:-1], soup.find_all('div', {'class': 'lister-item-image ribbonize'})
+    # print(f'complete soup + find_all(): {timeit.timeit(find_all_h3_and_posters, number=10) / 10 * 1000:.1f} ms')
+    # for parser in PARSER_BACKENDS:
+    #     t = timeit.timeit(lambda: extract_movies(page, parser), number=10) / 10
+    #     print(f'extract_movies(page, {parser!r}): {t * 1000:.1f} ms')
+    # print()
+
+    # # Test get_4_digit_substring() and get_4_digit_substrings() against the original (all 4-char substrings) version,
+    # # on random strings, and benchmark them on the years from data/movies.csv
+    # import random
+    # import timeit
+    #
+    # def get_4_digit_substring_orig(a_string):
+    #     all_4_digit_substrings = [a_string[i:(i+4)] for i in range(0, len(a_string) - 3)]
+    #     return next((x for x in all_4_digit_substrings if x.isdigit()), None)
+    #
+    # alphabet = '0123456789()-, ab\n²³٠١٢٣४५'
+    # samples = [''.join(random.choices(alphabet, k=random.randint(0, 12))) for _ in range(100_000)]
+    # print(all(get_4_digit_substring(s) == get_4_digit_substring_orig(s) for s in samples))
+    # print(get_4_digit_substrings(samples) == [get_4_digit_substring_orig(s) for s in samples])
+    #
+    # with open(utility.get_data_dir() / 'movies.csv', 'r', newline='', encoding='utf-8') as f:
+    #     years = [f'({row[1]})' for row in list(csv.reader(f))[1:]] * 1000
+    # print(get_4_digit_substrings(years) == [get_4_digit_substring_orig(y) for y in years])
+    # print(f'original:                 {timeit.timeit(lambda: [get_4_digit_substring_orig(y) for y in years], number=5):.3f} s')
+    # print(f'get_4_digit_substring():  {timeit.timeit(lambda: [get_4_digit_substring(y) for y in years], number=5):.3f} s')
+    # print(f'get_4_digit_substrings(): {timeit.timeit(lambda: get_4_digit_substrings(years), number=5):.3f} s')
+    # print()
+
+    # # Reprocess archived pages (here, copies of data/imdb.html) in a process pool, and compare with one process
+    # import os
+    # import shutil
+    # import tempfile
+    # import time
+    # archive = Path(tempfile.mkdtemp())
+    # files = [shutil.copy(utility.get_data_dir() / 'imdb.html', archive / f'{i}.html') for i in range(40)]
+    # for processes in (0, os.cpu_count()):
+    #     t = time.perf_counter()
+    #     movies = list(iter_m_info_from_files(files, processes=processes))
+    #     print(f'processes={processes}: {len(movies)} movies in {time.perf_counter() - t:.2f} s')
+    # shutil.rmtree(archive)
+    # print()
+
+    # # Test get_m_info()
+    # start_url = 'https://www.imdb.com/search/keyword/?keywords=rock-%27n%27-roll%2Crock-music&ref_=kw_ref_key&' \
+    #             'mode=detail&page=1&sort=moviemeter,asc'
+    # movies = get_m_info(start_url, 3)
+    # for m in movies:
+    #     print(m)
+    # print()
+
+    # # Test iter_m_info(): write the movies to a csv file as the pages arrive
+    # import csv
+    # with open(utility.get_data_dir() / 'movies.csv', 'w', newline='', encoding='utf-8') as f:
+    #     out = csv.writer(f)
+    #     out.writerow(['Title', 'Year', 'Link', 'Poster'])
+    #     for m in iter_m_info(start_url, 3, parser='lxml'):
+    #         out.writerow(m)
+    # print()
 
     # # Test writing the output of get_m_info() to a csv file
     # # A test list of movie info tuples, try with this list first; illustrates handling Unicode chars and whitespace
@@ -280,13 +1348,19 @@ if __name__ == "__main__":
     #           (' Ten Days That Unexpectedly Changed America', '2006', 'https://www.imdb.com/title/tt0953255/',
     #            'https://m.media-amazon.com/images/M/MV5BMjA2NDE3NDk1Nl5BMl5BanBnXkFtZTcwNjQ2NDMzMQ@@._V1_UY209_CR4,0,140,209_AL_.jpg')
     #           ]
-    import csv
-    from util.utility import get_data_dir
-    csv_file = get_data_dir() / 'movies.csv'
-    header_row = ['Title', 'Year', 'Link', 'Poster']
-    with open(csv_file, 'w', newline='', encoding='utf-8') as f:    # newline: avoid blank rows; encoding: enable ш,š...
-        out = csv.writer(f)
-        out.writerow(header_row)
-        out.writerows(movies)
+    # import csv
+    # from util.utility import get_data_dir
+    # csv_file = get_data_dir() / 'movies.csv'
+    # header_row = ['Title', 'Year', 'Link', 'Poster']
+    # with open(csv_file, 'w', newline='', encoding='utf-8') as f:    # newline: avoid blank rows; encoding: enable ш,š...
+    #     out = csv.writer(f)
+    #     out.writerow(header_row)
+    #     out.writerows(movies)
+
+    # Test export_m_info(): append the movies to a csv file page by page;
+    # if interrupted, running it again resumes the crawl from the page after the last one written
+    start_url = 'https://www.imdb.com/search/keyword/?keywords=rock-%27n%27-roll%2Crock-music&ref_=kw_ref_key&' \
+                'mode=detail&page=1&sort=moviemeter,asc'
+    print(export_m_info(start_url, utility.get_data_dir() / 'movies.csv', 3))
 
 
@@ -4,6 +4,9 @@
 
 # from util import utility
 from music.enums import Vocals, Instrument
+from array import array
+from itertools import compress
+from operator import attrgetter
 import json
 
 
@@ -17,11 +20,21 @@ class Musician:
     - __init__()
     - __str__()
     - __eq__(self, other) is the equivalent of Java equals() and should be overridden in classes
-    - __dict__ attribute of all objects ()
+    - __hash__(self) must be overridden together with __eq__(), so that equal objects have equal hashes
+      (otherwise the objects cannot be set members or dict keys)
+    - __dict__ attribute of all objects (), and __slots__, which replaces it with fixed, compact fields
     - data fields (instance variables)
     - methods - calling them by self.<method>(...) from the same class where they are defined
+
+    The fields are declared in __slots__, so Musician objects have no per-instance __dict__, which saves
+    a lot of memory in large rosters (see the benchmark in __main__). The slot for the vocals field of Singer
+    is declared here as well, since SingerSongwriter inherits from both Singer and Songwriter, and two base classes
+    that both add slots cannot be combined ('instance lay-out conflict'); Songwriter declares its own slots.
+    A slot that a class does not use stays unset, so e.g. a Musician object still has no vocals attribute.
     """
 
+    __slots__ = ('__name', 'is_band_member', 'vocals')
+
     def __init__(self, name, is_band_member=True):
         self.name = name
         self.is_band_member = is_band_member
@@ -49,6 +62,12 @@ class Musician:
     def __eq__(self, other):
         return isinstance(other, Musician) and other.name == self.name and other.is_band_member == self.is_band_member
 
+    def __hash__(self):
+        """Hash consistent with __eq__(). Do not change the name of a musician while it is in a set or a dict key.
+        """
+
+        return hash((self.name, self.is_band_member))
+
     def play(self, song_title, *args, **kwargs):
         """Assumes that song_title, *args (expressions of gratitude) and kwargs.values() (messages) are strings.
         Prints song_title, rhythm counts, expressions of gratitude and messages. A call example:
@@ -66,15 +85,97 @@ class Musician:
 
         return self.play(song_title, *args, **kwargs)
 
+    def compile_play(self):
+        """Returns the PlayTemplate that renders the same messages as play(), with the static parts precomputed.
+        The name is taken when the template is compiled, so recompile it after changing the name.
+        """
+
+        return PlayTemplate(f'{self.name} playing: ')
+
     # Alternative constructor
     @classmethod
     def from_str(cls, musician_string):
         """Inverted __str__() method.
-        Assumes that musician_string is in the format generated by __str__().
+        Assumes that musician_string is in the format generated by __str__() of cls or of any of its subclasses,
+        and returns the object of the right class (e.g. Musician.from_str() of a singer's string returns a Singer).
+        A line ending ('\n', '\r\n') is ignored, so lines read with <file>.readline() can be passed as they are.
+        """
+
+        musician = parse_musician_str(musician_string.rstrip('\r\n'))
+        if not isinstance(musician, cls):
+            raise ValueError(f'not a {cls.__name__}: {musician_string!r}')
+        return musician
+
+
+# The names of all the fields of Musician objects (the mangled name of the __name slot is _Musician__name)
+MUSICIAN_FIELDS = ('_Musician__name', 'is_band_member', 'vocals', 'instrument', 'writes_songs')
+
+
+def get_fields(musician):
+    """Returns the dictionary of the fields that are set in musician (the equivalent of __dict__ for slots).
+    """
+
+    return {field: getattr(musician, field) for field in MUSICIAN_FIELDS if hasattr(musician, field)}
+
+
+class PlayTemplate:
+    """The class describing a precompiled play() message of a musician (see Musician.compile_play()).
+    The static parts of the message (the musician's name and the ending added by subclasses, such as Singer's 'Yeah!')
+    are computed once, so rendering many messages for a show script only fills in the song-specific parts.
+    """
+
+    __slots__ = ('prefix', 'ending')
+
+    def __init__(self, prefix, ending=''):
+        self.prefix = prefix
+        self.ending = ending
+
+    def render(self, song_title, args=(), kwargs=None):
+        """Returns the same string as <musician>.play(song_title, *args, **kwargs).
+        """
+
+        if kwargs:
+            rhythm_count = kwargs.get('rhythm_count', '')
+            messages = ' '.join([v for k, v in kwargs.items() if k != 'rhythm_count'])
+        else:
+            rhythm_count = messages = ''
+        return f'{self.prefix}{rhythm_count}! - {song_title} - {" ".join(args)} {messages}{self.ending}'
+
+    def render_all(self, performances):
+        """Returns the list of the messages for performances, an iterable of (song_title, args, kwargs) tuples.
         """
 
-        name, band_member = musician_string.split(', ')
-        return cls(name, (True if band_member.startswith('band') else False))
+        render = self.render
+        return [render(song_title, args, kwargs) for song_title, args, kwargs in performances]
+
+
+class MusicianRegistry:
+    """The class describing an interning registry of musicians: intern() returns the single shared object
+    for all identical musicians (of the same class and with the same values of all fields),
+    which enables O(1) deduplication and lookups of musicians across large catalogs, and saves memory.
+    """
+
+    def __init__(self):
+        self.musicians = {}
+
+    @staticmethod
+    def get_key(musician):
+        return type(musician), tuple(get_fields(musician).values())
+
+    def intern(self, musician):
+        """Returns the registered musician identical to musician, registering musician first if there is none.
+        """
+
+        return self.musicians.setdefault(MusicianRegistry.get_key(musician), musician)
+
+    def __contains__(self, musician):
+        return MusicianRegistry.get_key(musician) in self.musicians
+
+    def __len__(self):
+        return len(self.musicians)
+
+    def __iter__(self):
+        return iter(self.musicians.values())
 
 
 class MusicianEncoder(json.JSONEncoder):
@@ -90,25 +191,33 @@ class MusicianEncoder(json.JSONEncoder):
 
 def musician_py_to_json(musician):
     """JSON encoder for Musician objects (default= parameter in json.dumps()).
+    Encodes a musician as {"__<class name>__": [<values of the fields in MUSICIAN_SCHEMAS>]}, with the enums as ints,
+    e.g. {"__Singer__": ["John Lennon", true, 1]}.
     """
 
     # recommendation: always use double quotes with JSON
 
-    if isinstance(musician, Musician):
-        d = musician.__dict__.copy()
-        return {"__Musician__": d}
+    schema = MUSICIAN_SCHEMAS.get(type(musician))
+    if schema is not None:
+        return schema.encode(musician)
     else:
         raise TypeError(f'object of type {musician.__class__.__name__}')
 
 
-def musician_json_to_py(musician_json):
+def musician_json_to_py(musician_json, registry=None):
     """JSON decoder for Musician objects (object_hook= parameter in json.loads()).
+    Also accepts the legacy format, {"__Musician__": {"_Musician__name": ..., "is_band_member": ...}}.
+    If a MusicianRegistry object is passed as registry (e.g. object_hook=partial(musician_json_to_py, registry=r)),
+    identical musicians decoded from JSON are interned, i.e. they all share one object.
     """
 
-    if "__Musician__" in musician_json:
-        m = Musician('')
-        m.__dict__.update(musician_json["__Musician__"])
-        return m
+    if len(musician_json) == 1:
+        for tag, values in musician_json.items():
+            schema = MUSICIAN_SCHEMAS_BY_TAG.get(tag)
+            if schema is None:
+                break
+            m = schema.decode_legacy(values) if isinstance(values, dict) else schema.decode(values)
+            return registry.intern(m) if registry is not None else m
     return musician_json
 
 
@@ -128,6 +237,8 @@ class Singer(Musician):
     #     # self.is_band_member = is_band_member
     #     self.vocals = vocals if isinstance(vocals, Vocals) else None
 
+    __slots__ = ()                                      # the vocals slot is declared in Musician
+
     # Version 2 - with multiple inheritance
     def __init__(self, vocals, **kwargs):
         super().__init__(**kwargs)
@@ -139,6 +250,9 @@ class Singer(Musician):
     def __eq__(self, other):
         return isinstance(other, Singer) and super().__eq__(other) and self.vocals == other.vocals
 
+    def __hash__(self):
+        return hash((super().__hash__(), self.vocals))
+
     def play(self, song_title, *args, **kwargs):
         """Overrides the play() method from superclass.
         Assumes that song_title, *args (expressions of gratitude) and kwargs.values() (messages) are strings.
@@ -148,6 +262,14 @@ class Singer(Musician):
 
         return super().play(song_title, *args, **kwargs) + '\nYeah!'
 
+    def compile_play(self):
+        """Overrides the compile_play() method from superclass, the same way play() is overridden.
+        """
+
+        template = super().compile_play()
+        template.ending += '\nYeah!'
+        return template
+
 
 class Songwriter(Musician):
     """The class describing the concept of songwriter.
@@ -161,6 +283,8 @@ class Songwriter(Musician):
     #     self.instrument = instrument if isinstance(instrument, Instrument) else None
     #     self.writes_songs = True
 
+    __slots__ = ('instrument', 'writes_songs')
+
     # Version 2 - with multiple inheritance
     def __init__(self, instrument, **kwargs):
         super().__init__(**kwargs)
@@ -187,6 +311,8 @@ class SingerSongwriter(Songwriter, Singer, ):
     https://stackoverflow.com/a/533675/1899061 (mixins explained, and what good they are in multiple inheritance)
     """
 
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -194,6 +320,332 @@ class SingerSongwriter(Songwriter, Singer, ):
         return 'Singer-songwriter: ' + super().__str__()
 
 
+# Compact int codes of the enums (0 stands for None), and the classes of the Musician hierarchy
+VOCALS_BY_CODE = (None, *Vocals)
+VOCALS_CODES = {vocals: code for code, vocals in enumerate(VOCALS_BY_CODE)}
+INSTRUMENTS_BY_CODE = (None, *Instrument)
+INSTRUMENT_CODES = {instrument: code for code, instrument in enumerate(INSTRUMENTS_BY_CODE)}
+MUSICIAN_CLASSES = (Musician, Singer, Songwriter, SingerSongwriter)
+MUSICIAN_CLASS_CODES = {cls: code for code, cls in enumerate(MUSICIAN_CLASSES)}
+
+
+class MusicianSchema:
+    """The class describing the JSON schema of a class from the Musician hierarchy:
+    the tag of its objects in JSON, the fields that are encoded (in that order) and the enum fields, encoded as ints.
+    Decoding creates the object with object.__new__() and sets the fields directly, without calling __init__().
+    """
+
+    enum_encoders = {'vocals': VOCALS_CODES.__getitem__, 'instrument': INSTRUMENT_CODES.__getitem__}
+    enum_decoders = {'vocals': VOCALS_BY_CODE, 'instrument': INSTRUMENTS_BY_CODE}           # the enums by code
+
+    def __init__(self, cls, *fields):
+        self.cls = cls
+        self.tag = f'__{cls.__name__}__'
+        self.fields = fields
+        self.get_values = attrgetter(*fields)
+        self.setters = [getattr(cls, field).__set__ for field in fields]          # slot descriptors' setters
+        self.enum_fields = [(i, MusicianSchema.enum_encoders[field], MusicianSchema.enum_decoders[field])
+                            for i, field in enumerate(fields) if field in MusicianSchema.enum_encoders]
+
+    def to_values(self, musician):
+        """Returns the list of the values of the fields of musician, with the enums as ints.
+        """
+
+        values = list(self.get_values(musician))
+        for i, encode, _ in self.enum_fields:
+            values[i] = encode(values[i])
+        return values
+
+    def encode(self, musician):
+        return {self.tag: self.to_values(musician)}
+
+    def decode(self, values):
+        if len(values) != len(self.fields):
+            raise ValueError(f'{self.tag} expects {len(self.fields)} values, got {len(values)}')
+        for i, _, by_code in self.enum_fields:
+            code = values[i]
+            if type(code) is not int or not 0 <= code < len(by_code):
+                raise ValueError(f'{self.tag} expects {self.fields[i]} codes from 0 to {len(by_code) - 1}, '
+                                 f'got {code!r}')
+            values[i] = by_code[code]
+        musician = object.__new__(self.cls)
+        for set_field, value in zip(self.setters, values):
+            set_field(musician, value)
+        return musician
+
+    def decode_legacy(self, fields):
+        """Decodes the legacy format, a dict of fields named as in MUSICIAN_FIELDS.
+        """
+
+        musician = object.__new__(self.cls)
+        for field, value in fields.items():
+            setattr(musician, field, value)
+        return musician
+
+
+# The JSON schemas of the classes from the Musician hierarchy ('_Musician__name' is the slot of the name property)
+MUSICIAN_SCHEMAS = {
+    Musician: MusicianSchema(Musician, '_Musician__name', 'is_band_member'),
+    Singer: MusicianSchema(Singer, '_Musician__name', 'is_band_member', 'vocals'),
+    Songwriter: MusicianSchema(Songwriter, '_Musician__name', 'is_band_member', 'instrument', 'writes_songs'),
+    SingerSongwriter: MusicianSchema(SingerSongwriter,
+                                     '_Musician__name', 'is_band_member', 'vocals', 'instrument', 'writes_songs'),
+}
+MUSICIAN_SCHEMAS_BY_TAG = {schema.tag: schema for schema in MUSICIAN_SCHEMAS.values()}
+
+
+class MusicianTable:
+    """The class describing a columnar table of musicians, for bulk analytics over many Musician objects.
+    Each field is stored as a column:
+    - names: a list of names
+    - kinds, vocals, instruments: small int codes (MUSICIAN_CLASS_CODES, VOCALS_CODES, INSTRUMENT_CODES)
+      in array('b') buffers, one byte per musician
+    - band_members, songwriters: bit-packed is_band_member and writes_songs flags (bit i of the bytearray is row i)
+    The buffers support the buffer protocol, so they can also be wrapped without copying, e.g. by numpy.frombuffer().
+
+    Filters are vectorized: where() returns a selection of rows as an int bitmask (bit i is row i), computed with
+    bytes.translate() and bitwise operations on whole columns, without a Python loop over the musicians,
+    e.g. table.where(vocals=Vocals.LEAD_VOCALS, is_band_member=False) selects all lead singers who are not band members.
+    """
+
+    selector_table = bytes.maketrans(b'01', b'\x00\x01')          # '0'/'1' -> 0/1, for itertools.compress()
+
+    def __init__(self, musicians=()):
+        self.names = []
+        self.kinds = array('b')
+        self.vocals = array('b')
+        self.instruments = array('b')
+        self.band_members = bytearray()
+        self.songwriters = bytearray()
+        self.extend(musicians)
+
+    def append(self, musician):
+        i = len(self.names)
+        if i % 8 == 0:
+            self.band_members.append(0)
+            self.songwriters.append(0)
+        self.names.append(musician.name)
+        self.kinds.append(MUSICIAN_CLASS_CODES[type(musician)])
+        self.vocals.append(VOCALS_CODES[getattr(musician, 'vocals', None)])
+        self.instruments.append(INSTRUMENT_CODES[getattr(musician, 'instrument', None)])
+        if musician.is_band_member:
+            self.band_members[i >> 3] |= 1 << (i & 7)
+        if getattr(musician, 'writes_songs', False):
+            self.songwriters[i >> 3] |= 1 << (i & 7)
+
+    def extend(self, musicians):
+        for musician in musicians:
+            self.append(musician)
+
+    def __len__(self):
+        return len(self.names)
+
+    def get_row(self, i):
+        """Returns the row of index i (negative indices count from the end), like list indexing does.
+        """
+
+        if not -len(self) <= i < len(self):
+            raise IndexError('MusicianTable index out of range')
+        return i % len(self)
+
+    def __getitem__(self, i):
+        """Returns the Musician object (of the right class) built from row i.
+        """
+
+        i = self.get_row(i)
+        kind = MUSICIAN_CLASSES[self.kinds[i]]
+        kwargs = {'name': self.names[i], 'is_band_member': bool(self.band_members[i >> 3] >> (i & 7) & 1)}
+        if issubclass(kind, Singer):
+            kwargs['vocals'] = VOCALS_BY_CODE[self.vocals[i]]
+        if issubclass(kind, Songwriter):
+            kwargs['instrument'] = INSTRUMENTS_BY_CODE[self.instruments[i]]
+        musician = kind(**kwargs)
+        if issubclass(kind, Songwriter):
+            musician.writes_songs = bool(self.songwriters[i >> 3] >> (i & 7) & 1)
+        return musician
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def to_musicians(self):
+        return list(self)
+
+    def get_all_rows(self):
+        """Returns the bitmask that selects all the rows.
+        """
+
+        return (1 << len(self)) - 1
+
+    @staticmethod
+    def get_code_mask(column, codes):
+        """Returns the bitmask of the rows of column (an array('b')) whose code is one of codes.
+        The column is translated into a string of '0's and '1's (row 0 first), which is then read as a binary int.
+        """
+
+        if not column:
+            return 0
+        table = bytearray(b'0' * 256)
+        for code in codes:
+            table[code] = ord('1')
+        return int(column.tobytes().translate(table)[::-1], 2)
+
+    def where(self, kind=None, vocals=None, instrument=None, is_band_member=None, writes_songs=None):
+        """Returns the bitmask of the rows that satisfy all the conditions (the ones that are not None):
+        kind is a class from the Musician hierarchy (selects its subclasses as well),
+        vocals and instrument are Vocals and Instrument values, is_band_member and writes_songs are bools.
+        """
+
+        mask = self.get_all_rows()
+        if kind is not None:
+            mask &= MusicianTable.get_code_mask(self.kinds, [MUSICIAN_CLASS_CODES[cls] for cls in MUSICIAN_CLASSES
+                                                             if issubclass(cls, kind)])
+        if vocals is not None:
+            mask &= MusicianTable.get_code_mask(self.vocals, [VOCALS_CODES[vocals]])
+        if instrument is not None:
+            mask &= MusicianTable.get_code_mask(self.instruments, [INSTRUMENT_CODES[instrument]])
+        for flag, column in ((is_band_member, self.band_members), (writes_songs, self.songwriters)):
+            if flag is not None:
+                bits = int.from_bytes(column, 'little')
+                mask &= bits if flag else ~bits
+        return mask
+
+    def count(self, **conditions):
+        """Returns the number of rows that satisfy the conditions (see where()).
+        """
+
+        return self.where(**conditions).bit_count()
+
+    def get_indices(self, mask):
+        """Returns the list of the indices of the rows selected by mask.
+        """
+
+        if not mask:
+            return []
+        selectors = f'{mask:0{len(self)}b}'[::-1].encode('ascii').translate(MusicianTable.selector_table)
+        return list(compress(range(len(self)), selectors))
+
+    def take(self, indices):
+        """Returns a new MusicianTable with the rows at indices, copied column by column (no Musician objects).
+        """
+
+        indices = [self.get_row(i) for i in indices]
+        table = MusicianTable()
+        table.names = [self.names[i] for i in indices]
+        table.kinds = array('b', [self.kinds[i] for i in indices])
+        table.vocals = array('b', [self.vocals[i] for i in indices])
+        table.instruments = array('b', [self.instruments[i] for i in indices])
+        table.band_members = MusicianTable.take_bits(self.band_members, indices)
+        table.songwriters = MusicianTable.take_bits(self.songwriters, indices)
+        return table
+
+    @staticmethod
+    def take_bits(column, indices):
+        """Returns the bit-packed column (a bytearray) with the bits of column at indices.
+        """
+
+        bits = ''.join(['1' if column[i >> 3] >> (i & 7) & 1 else '0' for i in reversed(indices)])
+        return bytearray(int(bits or '0', 2).to_bytes((len(indices) + 7) // 8, 'little'))
+
+    def filter(self, **conditions):
+        """Returns a new MusicianTable with the rows that satisfy the conditions (see where()).
+        """
+
+        return self.take(self.get_indices(self.where(**conditions)))
+
+
+# Precomputed string segments for to_lines() and from_lines()
+SINGER_SONGWRITER_PREFIX = 'Singer-songwriter: '
+BAND_MEMBER_SUFFIXES = {True: ', band member', False: ', solo musician'}
+VOCALS_SUFFIXES = {vocals: '; ' + vocals.name.lower().replace('_', ' ') for vocals in Vocals}
+INSTRUMENT_SUFFIXES = {instrument: '; ' + instrument.name.lower().replace('_', ' ') for instrument in Instrument}
+ENUMS_BY_SUFFIX = {suffix[2:]: value for suffix, value in (*((v, k) for k, v in VOCALS_SUFFIXES.items()),
+                                                          *((v, k) for k, v in INSTRUMENT_SUFFIXES.items()))}
+
+
+def to_line(musician):
+    """Returns the same string as str(musician), from the precomputed segments (without calling __str__() methods
+    up the hierarchy and concatenating their results).
+    """
+
+    cls = type(musician)
+    if cls is Musician:
+        return musician.name + BAND_MEMBER_SUFFIXES[musician.is_band_member]
+    if cls is Singer:
+        return musician.name + BAND_MEMBER_SUFFIXES[musician.is_band_member] + VOCALS_SUFFIXES[musician.vocals]
+    if cls is Songwriter:
+        return (musician.name + BAND_MEMBER_SUFFIXES[musician.is_band_member] +
+                INSTRUMENT_SUFFIXES[musician.instrument])
+    if cls is SingerSongwriter:
+        return ''.join((SINGER_SONGWRITER_PREFIX, musician.name, BAND_MEMBER_SUFFIXES[musician.is_band_member],
+                        VOCALS_SUFFIXES[musician.vocals], INSTRUMENT_SUFFIXES[musician.instrument]))
+    return str(musician)                                # other subclasses may override __str__()
+
+
+def to_lines(musicians):
+    """Generator that turns musicians into lines of text, in the format of __str__() and ending with '\n',
+    e.g. for streaming a large roster to a file with <file>.writelines(to_lines(musicians)).
+    """
+
+    for musician in musicians:
+        yield to_line(musician) + '\n'
+
+
+def parse_musician_str(musician_string):
+    """Returns the Musician object (of the right class) from musician_string, in the format generated by __str__().
+    The enum suffixes ('; lead vocals', '; bass',...) are split off from the right, and the name is split off
+    from the band member/solo musician part with rpartition(), so names can contain ', ' and '; '.
+    """
+
+    if '; ' not in musician_string and not musician_string.startswith(SINGER_SONGWRITER_PREFIX):
+        # fast path for plain musicians (no enum suffixes), the most common members of bands
+        name, sep, band_member = musician_string.rpartition(', ')
+        if sep and band_member == 'band member':
+            return Musician(name, True)
+        if sep and band_member == 'solo musician':
+            return Musician(name, False)
+        raise ValueError(f'not a musician: {musician_string!r}')
+
+    singer_songwriter = musician_string.startswith(SINGER_SONGWRITER_PREFIX)
+    s = musician_string[len(SINGER_SONGWRITER_PREFIX):] if singer_songwriter else musician_string
+    vocals = instrument = None
+    while True:
+        rest, sep, suffix = s.rpartition('; ')
+        value = ENUMS_BY_SUFFIX.get(suffix) if sep else None
+        if value is None:
+            break
+        if isinstance(value, Vocals):
+            vocals = value
+        else:
+            instrument = value
+        s = rest
+    name, sep, band_member = s.rpartition(', ')
+    if not sep or band_member not in ('band member', 'solo musician'):
+        raise ValueError(f'not a musician: {musician_string!r}')
+    is_band_member = band_member == 'band member'
+    if singer_songwriter:
+        return SingerSongwriter(name=name, vocals=vocals, instrument=instrument, is_band_member=is_band_member)
+    if vocals is not None:
+        return Singer(name=name, vocals=vocals, is_band_member=is_band_member)
+    if instrument is not None:
+        return Songwriter(name=name, instrument=instrument, is_band_member=is_band_member)
+    return Musician(name, is_band_member)
+
+
+def from_lines(lines):
+    """Generator that turns lines of text in the format of to_lines() (e.g. an open file) into Musician objects.
+    Blank lines are skipped; a malformed line raises ValueError with its line number.
+    """
+
+    for line_number, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+        if not line:
+            continue
+        try:
+            yield parse_musician_str(line)
+        except ValueError as e:
+            raise ValueError(f'line {line_number}: {e}') from None
+
+
 if __name__ == "__main__":
 
     # # from testdata.musicians import *
@@ -299,6 +751,110 @@ if __name__ == "__main__":
     # print(johnLennon_py)
     # print(johnLennon_py == johnLennon)
 
+    # # Demonstrate hashing and interning
+    # # Musicians can be set members and dict keys, so dedup and membership checks are O(1)
+    # the_beatles = {Musician('John Lennon'), Musician('Paul McCartney'), Musician('George Harrison'),
+    #                Musician('Ringo Starr'), Musician('John Lennon')}
+    # print(len(the_beatles), Musician('Ringo Starr') in the_beatles)
+    # # Identical musicians decoded from JSON share one object
+    # from functools import partial
+    # registry = MusicianRegistry()
+    # beatles_json = json.dumps(list(the_beatles) * 2, default=musician_py_to_json)
+    # beatles_py = json.loads(beatles_json, object_hook=partial(musician_json_to_py, registry=registry))
+    # print(len(registry), beatles_py[0] is beatles_py[4])
+    # print()
+
+    # # Filter 1M musicians: all lead singers who are not band members (list of objects vs. MusicianTable)
+    # import random
+    # import timeit
+    # roster = [random.choice([lambda i: Musician(f'M{i}', is_band_member=bool(i % 2)),
+    #                          lambda i: Singer(name=f'S{i}', vocals=random.choice(list(Vocals)),
+    #                                           is_band_member=bool(i % 3)),
+    #                          lambda i: Songwriter(name=f'W{i}', instrument=random.choice(list(Instrument)))])(i)
+    #           for i in range(1_000_000)]
+    # table = MusicianTable(roster)
+    # def filter_objects():
+    #     return [m for m in roster if getattr(m, 'vocals', None) == Vocals.LEAD_VOCALS and not m.is_band_member]
+    # def filter_table():
+    #     return table.get_indices(table.where(vocals=Vocals.LEAD_VOCALS, is_band_member=False))
+    # print([roster[i] for i in filter_table()] == filter_objects())
+    # print(f'list of objects: {timeit.timeit(filter_objects, number=5) / 5 * 1000:.1f} ms')
+    # print(f'MusicianTable:   {timeit.timeit(filter_table, number=5) / 5 * 1000:.1f} ms')
+    # print(f'MusicianTable, count only: '
+    #       f'{timeit.timeit(lambda: table.count(vocals=Vocals.LEAD_VOCALS, is_band_member=False), number=5) / 5 * 1000:.1f} ms')
+    # print()
+
+    # # Memory used by 1M musicians (with __slots__, vs. the same class with a per-instance __dict__)
+    # import tracemalloc
+    #
+    # class DictMusician:
+    #     def __init__(self, name, is_band_member=True):
+    #         self.name = name
+    #         self.is_band_member = is_band_member
+    #
+    # for cls in (DictMusician, Musician):
+    #     tracemalloc.start()
+    #     roster = [cls(f'Musician {i}', is_band_member=bool(i % 2)) for i in range(1_000_000)]
+    #     names_size = sum(len(m.name) + 49 for m in roster)              # the name strings are the same for both
+    #     print(f'{cls.__name__}: {(tracemalloc.get_traced_memory()[0] - names_size) / len(roster):.0f} bytes/object')
+    #     del roster
+    #     tracemalloc.stop()
+    # print()
+
+    # # Encode and decode 1M musicians (the legacy __dict__-style hooks vs. the schema-driven ones)
+    # import time
+    # def legacy_py_to_json(musician):
+    #     return {"__Musician__": get_fields(musician)}
+    # def legacy_json_to_py(musician_json):
+    #     if "__Musician__" in musician_json:
+    #         m = Musician('')
+    #         for field, value in musician_json["__Musician__"].items():
+    #             setattr(m, field, value)
+    #         return m
+    #     return musician_json
+    # roster = [Musician(f'Musician {i}', is_band_member=bool(i % 2)) for i in range(1_000_000)]
+    # for encoder, decoder in ((legacy_py_to_json, legacy_json_to_py), (musician_py_to_json, musician_json_to_py)):
+    #     start = time.perf_counter()
+    #     roster_json = json.dumps(roster, default=encoder)
+    #     encoded = time.perf_counter()
+    #     roster_py = json.loads(roster_json, object_hook=decoder)
+    #     print(f'{encoder.__name__}: {len(roster_json) / 1e6:.1f} MB, encode {encoded - start:.2f} s, '
+    #           f'decode {time.perf_counter() - encoded:.2f} s, {roster_py == roster}')
+    # print()
+
+    # # Write and read 1M musicians as lines of text (str()/from_str() one at a time vs. to_lines()/from_lines())
+    # import random
+    # import time
+    # roster = [random.choice([lambda i: Musician(f'Musician, {i}', is_band_member=bool(i % 2)),
+    #                          lambda i: Singer(name=f'Singer {i}', vocals=random.choice(list(Vocals))),
+    #                          lambda i: Songwriter(name=f'Songwriter {i}', instrument=random.choice(list(Instrument))),
+    #                          lambda i: SingerSongwriter(name=f'Singer-songwriter {i}', vocals=Vocals.LEAD_VOCALS,
+    #                                                     instrument=random.choice(list(Instrument)))])(i)
+    #           for i in range(1_000_000)]
+    # start = time.perf_counter()
+    # lines = [str(m) + '\n' for m in roster]
+    # print(f'str():        {time.perf_counter() - start:.2f} s')
+    # start = time.perf_counter()
+    # lines = list(to_lines(roster))
+    # print(f'to_lines():   {time.perf_counter() - start:.2f} s, {len(lines) / (time.perf_counter() - start):,.0f} lines/s')
+    # start = time.perf_counter()
+    # musicians = list(from_lines(lines))
+    # print(f'from_lines(): {time.perf_counter() - start:.2f} s, '
+    #       f'{len(lines) / (time.perf_counter() - start):,.0f} lines/s')
+    # print(musicians == roster and [type(m) for m in musicians] == [type(m) for m in roster])
+    # print()
+
+    # # Render 1M play() messages for a show script (play() vs. a precompiled PlayTemplate)
+    # import timeit
+    # lennon = SingerSongwriter(name='John Lennon', vocals=Vocals.LEAD_VOCALS, instrument=Instrument.RHYTHM_GUITAR)
+    # performances = [(f'Song {i}', ('Thank you!', "You're wonderful!"),
+    #                  {'rhythm_count': 'One, two, three, four', 'end': 'Good night!'}) for i in range(1_000_000)]
+    # template = lennon.compile_play()
+    # print(template.render_all(performances) == [lennon.play(s, *a, **k) for s, a, k in performances])
+    # print(f'play():        {timeit.timeit(lambda: [lennon.play(s, *a, **k) for s, a, k in performances], number=1):.2f} s')
+    # print(f'PlayTemplate:  {timeit.timeit(lambda: template.render_all(performances), number=1):.2f} s')
+    # print()
+
     # # List of objects
     johnLennon = Musician('John Lennon', is_band_member=True)
     # paulMcCartney = Musician('Paul McCartney', is_band_member=True)
@@ -0,0 +1,254 @@
+"""Binary persistence of Studio -> Band -> Musician object graphs.
+A file starts with a header (MAGIC, the schema version and the format), followed by the studios, either pickled
+(pickle protocol 5, which stores every object only once, so musicians and bands shared among studios stay shared)
+or packed with msgpack as flat tables of musicians, bands and studios that refer to each other by index.
+
+Large band catalogs can also be saved as indexed files (see write_indexed_bands() and IndexedBandFile),
+from which a single band can be loaded without reading the rest of the file.
+"""
+
+from datetime import date
+import json
+import mmap
+from pathlib import Path
+import pickle
+
+from music.musician import MUSICIAN_CLASSES, MUSICIAN_CLASS_CODES, MUSICIAN_SCHEMAS
+from music.band import Band, band_py_to_json, band_json_to_py
+from music.studio import Studio
+
+
+MAGIC = b'MUSC'
+SCHEMA_VERSION = 1
+FORMATS = ('pickle', 'msgpack')
+
+
+class PersistenceError(Exception):
+    """Exception raised when a file is not a studio catalog or is written in a newer, unknown schema version.
+    """
+
+    def __init__(self, file, message):
+        self.message = f'{file}: {message}'
+        super().__init__(self.message)
+
+
+def date_or_year_py_to_table(d):
+    return d.isoformat() if isinstance(d, date) else d
+
+
+def date_or_year_table_to_py(d):
+    return date.fromisoformat(d) if isinstance(d, str) else d
+
+
+def studios_to_tables(studios):
+    """Flattens studios into a dict of tables (lists of rows): musicians (the class code and the values of the fields
+    in MUSICIAN_SCHEMAS), bands (with the indices of their members) and studios (with the indices of their bands).
+    Each musician and each band object is stored only once, however many bands and studios it belongs to.
+    """
+
+    studios = list(studios)
+    musicians, bands, studio_rows = [], [], []
+    musician_indices, band_indices = {}, {}                     # id(object) -> row; studios keeps the objects alive
+    for studio in studios:
+        studio_bands = []
+        for band in studio.bands:
+            if id(band) not in band_indices:
+                members = []
+                for musician in band.members:
+                    if id(musician) not in musician_indices:
+                        musician_indices[id(musician)] = len(musicians)
+                        musicians.append([MUSICIAN_CLASS_CODES[type(musician)],
+                                          *MUSICIAN_SCHEMAS[type(musician)].to_values(musician)])
+                    members.append(musician_indices[id(musician)])
+                band_indices[id(band)] = len(bands)
+                bands.append([band.name, date_or_year_py_to_table(band.formed), date_or_year_py_to_table(band.split),
+                              members])
+            studio_bands.append(band_indices[id(band)])
+        studio_rows.append([studio.name, studio.location, studio.start_date.isoformat(), studio.end_date.isoformat(),
+                            studio_bands])
+    return {'musicians': musicians, 'bands': bands, 'studios': studio_rows}
+
+
+def tables_to_studios(tables):
+    """Inverted studios_to_tables().
+    """
+
+    musicians = [MUSICIAN_SCHEMAS[MUSICIAN_CLASSES[row[0]]].decode(row[1:]) for row in tables['musicians']]
+    bands = [Band(name, *[musicians[i] for i in members],
+                  formed=date_or_year_table_to_py(formed), split=date_or_year_table_to_py(split))
+             for name, formed, split, members in tables['bands']]
+    studios = []
+    for name, location, start_date, end_date, studio_bands in tables['studios']:
+        s = Studio('', '')
+        s.__dict__.update(name=name, location=location, start_date=date.fromisoformat(start_date),
+                          end_date=date.fromisoformat(end_date), bands=tuple(bands[i] for i in studio_bands))
+        studios.append(s)
+    return studios
+
+
+def save_studios(studios, file, format='pickle'):
+    """Saves studios (an iterable of Studio objects) to file, in one of FORMATS.
+    The msgpack format requires the msgpack package (pip install msgpack).
+    """
+
+    if format not in FORMATS:
+        raise ValueError(f'unknown format {format!r}, expected one of {FORMATS}')
+    studios = list(studios)
+    if format == 'pickle':
+        data = pickle.dumps(studios, protocol=5)
+    else:
+        import msgpack
+        data = msgpack.packb(studios_to_tables(studios))
+    with open(file, 'wb') as f:
+        f.write(MAGIC + bytes([SCHEMA_VERSION, FORMATS.index(format)]))
+        f.write(data)
+
+
+def load_studios(file):
+    """Loads the list of studios saved by save_studios() (in any of FORMATS) from file.
+    Raises PersistenceError if file is not a studio catalog, or if it was saved with a newer schema version.
+    """
+
+    with open(file, 'rb') as f:
+        header = f.read(len(MAGIC) + 2)
+        if len(header) < len(MAGIC) + 2 or not header.startswith(MAGIC):
+            raise PersistenceError(file, 'not a studio catalog')
+        version, format_code = header[len(MAGIC):]
+        if version > SCHEMA_VERSION:
+            raise PersistenceError(file, f'schema version {version} is newer than {SCHEMA_VERSION}')
+        if format_code >= len(FORMATS):
+            raise PersistenceError(file, f'unknown format code {format_code}')
+        if FORMATS[format_code] == 'pickle':
+            return pickle.load(f)
+        import msgpack
+        return tables_to_studios(msgpack.unpackb(f.read(), strict_map_key=False))
+
+
+def get_index_file(file):
+    return Path(str(file) + '.index')
+
+
+def write_indexed_bands(bands, file):
+    """Writes bands to file as JSON Lines (one band per line), and the index of the file to <file>.index:
+    a JSON object that maps each band name to the byte offset and length of the band's line.
+    Returns the number of bands written. Band names must be unique.
+    """
+
+    index = {}
+    offset = 0
+    with open(file, 'wb') as f:
+        for band in bands:
+            if band.name in index:
+                raise ValueError(f'duplicate band name {band.name!r}')
+            line = json.dumps(band, default=band_py_to_json).encode('utf-8') + b'\n'
+            f.write(line)
+            index[band.name] = (offset, len(line))
+            offset += len(line)
+    get_index_file(file).write_text(json.dumps(index), encoding='utf-8')
+    return len(index)
+
+
+class IndexedBandFile:
+    """The class describing a band catalog file written by write_indexed_bands(), opened for random access.
+    The data file is memory-mapped, and looking up a band by name is a dict lookup in the index (O(1)), after which
+    only that band's bytes are read and decoded, e.g.
+        with IndexedBandFile(file) as catalog:
+            the_beatles = catalog['The Beatles']
+    """
+
+    def __init__(self, file):
+        self.index = json.loads(get_index_file(file).read_text(encoding='utf-8'))
+        self.file = open(file, 'rb')
+        # an empty file cannot be memory-mapped (and there is nothing to look up in it)
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.index else None
+
+    def __getitem__(self, name):
+        offset, length = self.index[name]
+        return json.loads(self.mmap[offset:offset + length], object_hook=band_json_to_py)
+
+    def get(self, name, default=None):
+        return self[name] if name in self.index else default
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        """Iterates over the band names.
+        """
+
+        return iter(self.index)
+
+    def close(self):
+        if self.mmap is not None:
+            self.mmap.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == "__main__":
+
+    # import time
+
+    # from music.musician import Musician
+    # from music.studio import studio_py_to_json, studio_json_to_py
+    # from util.utility import get_data_dir
+
+    # # Save and load a large studio catalog (JSON vs. pickle vs. msgpack, if installed)
+    # bands = [Band(f'Band {i}', *[Musician(f'Musician {i}-{j}') for j in range(5)], formed=1960 + i % 10)
+    #          for i in range(1000)]
+    # studios = [Studio(f'Studio {i}', 'London', *bands[i % 20 * 50:i % 20 * 50 + 50]) for i in range(1000)]
+
+    # file = get_data_dir() / 'studios.json'
+    # start = time.perf_counter()
+    # file.write_text(json.dumps(studios, default=studio_py_to_json))
+    # saved = time.perf_counter()
+    # studios_py = json.loads(file.read_text(), object_hook=studio_json_to_py)
+    # print(f'json: {file.stat().st_size / 1e6:.1f} MB, save {saved - start:.2f} s, '
+    #       f'load {time.perf_counter() - saved:.2f} s, {studios_py == studios}')
+    # file.unlink()
+
+    # for format in FORMATS:
+    #     file = get_data_dir() / f'studios.{format}'
+    #     try:
+    #         start = time.perf_counter()
+    #         save_studios(studios, file, format=format)
+    #         saved = time.perf_counter()
+    #         studios_py = load_studios(file)
+    #     except ImportError as e:
+    #         print(f'{format}: {e}')
+    #         continue
+    #     print(f'{format}: {file.stat().st_size / 1e6:.1f} MB, save {saved - start:.2f} s, '
+    #           f'load {time.perf_counter() - saved:.2f} s, {studios_py == studios}, '
+    #           f'shared bands: {studios_py[0].bands[0] is studios_py[20].bands[0]}')
+    #     file.unlink()
+    # print()
+
+    # # Load one band from a catalog of 100k bands (decoding the whole JSON document vs. an indexed, memory-mapped file)
+    # bands = [Band(f'Band {i}', *[Musician(f'Musician {i}-{j}') for j in range(5)], formed=1960 + i % 10)
+    #          for i in range(100_000)]
+    # file = get_data_dir() / 'bands.json'
+    # file.write_text(json.dumps(bands, default=band_py_to_json))
+    # start = time.perf_counter()
+    # band = next(b for b in json.loads(file.read_text(), object_hook=band_json_to_py) if b.name == 'Band 54321')
+    # print(f'json: {(time.perf_counter() - start) * 1000:.1f} ms, {band == bands[54321]}')
+    # file.unlink()
+    # file = get_data_dir() / 'bands.jsonl'
+    # write_indexed_bands(bands, file)
+    # start = time.perf_counter()
+    # with IndexedBandFile(file) as catalog:
+    #     opened = time.perf_counter()
+    #     band = catalog['Band 54321']
+    #     print(f'indexed: open {(opened - start) * 1000:.1f} ms, '
+    #           f'lookup {(time.perf_counter() - opened) * 1000:.3f} ms, {band == bands[54321]}')
+    # file.unlink()
+    # get_index_file(file).unlink()
+
+    pass
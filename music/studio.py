@@ -78,31 +78,80 @@ class StudioEncoder(json.JSONEncoder):
 
 def studio_py_to_json(studio):
     """JSON encoder for Studio objects (default= parameter in json.dumps()).
+    The bands are nested as a native JSON list, and other objects (bands, musicians) are passed on to band_py_to_json().
     """
 
     if isinstance(studio, Studio):
         d = studio.__dict__.copy()
-        d['bands'] = json.dumps(studio.bands, default=band_py_to_json)
+        d['bands'] = list(studio.bands)
         d['start_date'] = date_py_to_json(studio.start_date)
         d['end_date'] = date_py_to_json(studio.end_date)
         return {"__Studio__": d}
     else:
-        raise TypeError(f'object of type {studio.__class__.__name__}')
+        return band_py_to_json(studio)
 
 
 def studio_json_to_py(studio_json):
     """JSON decoder for Studio objects (object_hook= parameter in json.loads()).
+    Other objects (bands, musicians) are passed on to band_json_to_py().
+    Also accepts the legacy format, with the bands as a nested JSON string.
     """
 
     if "__Studio__" in studio_json:
         s = Studio('', '')
         s.__dict__.update(studio_json["__Studio__"])
-        s.bands = tuple(json.loads(s.bands, object_hook=band_json_to_py))
+        if isinstance(s.bands, str):
+            s.bands = tuple(json.loads(s.bands, object_hook=band_json_to_py))
+        else:
+            s.bands = tuple(s.bands)
         s.start_date = date_json_to_py(s.start_date)
         s.end_date = date_json_to_py(s.end_date)
         return s
     else:
-        return studio_json
+        return band_json_to_py(studio_json)
+
+
+def write_json_lines(objects, file, default=studio_py_to_json):
+    """Writes objects (studios, bands or musicians, e.g. from a generator) to file in the JSON Lines format,
+    one JSON document per line, so that the whole catalog is never in memory at once.
+    Returns the number of objects written.
+    """
+
+    n = 0
+    with open(file, 'w', encoding='utf-8') as f:
+        for obj in objects:
+            f.write(json.dumps(obj, default=default) + '\n')
+            n += 1
+    return n
+
+
+def iter_json_lines(file, object_hook=studio_json_to_py, start=0, end=None):
+    """Generator that lazily decodes the objects from a JSON Lines file written by write_json_lines().
+    Only the lines that start in the byte range [start, end) are decoded, so that a large file can be split among
+    workers by byte offsets (see get_json_lines_splits()); a line that starts before start belongs to the previous range.
+    """
+
+    with open(file, 'rb') as f:
+        if start > 0:
+            f.seek(start - 1)
+            f.readline()                                # skip to the first line that starts at or after start
+        position = f.tell()
+        while end is None or position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            if line.strip():
+                yield json.loads(line, object_hook=object_hook)
+
+
+def get_json_lines_splits(file, n):
+    """Returns n (start, end) byte ranges of about the same size that cover file, for iter_json_lines().
+    """
+
+    size = Path(file).stat().st_size
+    bounds = [size * i // n for i in range(n + 1)]
+    return list(zip(bounds, bounds[1:]))
 
 
 if __name__ == "__main__":
@@ -212,6 +261,41 @@ if __name__ == "__main__":
     # print()
     # print(abbey_road_py)
 
+    # # Encode and decode a large studio catalog (the legacy nested JSON strings vs. natively nested JSON)
+    # import time
+    # def legacy_band_py_to_json(band):
+    #     d = band.__dict__.copy()
+    #     d["members"] = json.dumps(band.members, default=musician_py_to_json)
+    #     return {"__Band__": d}
+    # def legacy_studio_py_to_json(studio):
+    #     d = studio.__dict__.copy()
+    #     d['bands'] = json.dumps(studio.bands, default=legacy_band_py_to_json)
+    #     d['start_date'] = date_py_to_json(studio.start_date)
+    #     d['end_date'] = date_py_to_json(studio.end_date)
+    #     return {"__Studio__": d}
+    # bands = [Band(f'Band {i}', *[Musician(f'Musician {i}-{j}') for j in range(5)], formed=1960 + i % 10)
+    #          for i in range(1000)]
+    # studios = [Studio(f'Studio {i}', 'London', *bands[i % 20 * 50:i % 20 * 50 + 50]) for i in range(1000)]
+    # for encoder in (legacy_studio_py_to_json, studio_py_to_json):
+    #     start = time.perf_counter()
+    #     studios_json = json.dumps(studios, default=encoder)
+    #     encoded = time.perf_counter()
+    #     studios_py = json.loads(studios_json, object_hook=studio_json_to_py)
+    #     print(f'{encoder.__name__}: {len(studios_json) / 1e6:.1f} MB, encode {encoded - start:.2f} s, '
+    #           f'decode {time.perf_counter() - encoded:.2f} s, {studios_py == studios}')
+    # print()
+
+    # # Write a large studio catalog to a JSON Lines file, and read it back lazily, in 4 splits
+    # file = get_data_dir() / 'studios.jsonl'
+    # bands = [Band(f'Band {i}', *[Musician(f'Musician {i}-{j}') for j in range(5)], formed=1960 + i % 10)
+    #          for i in range(1000)]
+    # print(write_json_lines((Studio(f'Studio {i}', 'London', *bands[i % 20 * 50:i % 20 * 50 + 50])
+    #                         for i in range(10_000)), file))
+    # print(sum(1 for _ in iter_json_lines(file)))
+    # print([sum(1 for _ in iter_json_lines(file, start=start, end=end))
+    #        for start, end in get_json_lines_splits(file, 4)])
+    # print()
+
     # List of objects
     the_beatles = Band('The Beatles', *[johnLennon, paulMcCartney, georgeHarrison, ringoStarr],
                        formed=1962, split=1970)